@@ -0,0 +1,92 @@
+// Sweep completion time against local stand-ins:
+//
+//   cargo bench --bench sweep
+//
+// "simulated" sweeps a /16 (65,534 hosts) on an in-process stand-in network:
+// one host in eight answers after 1-20 ms, the rest stay silent until the
+// timeout. It measures the sweep engine alone. The row with 50 probes in
+// flight, what the monitoring semaphore allows, covers a /20 only, as a /16
+// takes it about four minutes; compare the rate column.
+// "loopback" runs the real probe (system `ping`) against 127.0.0.0/22, where
+// every address answers, to show the cost of one probe process.
+#[path = "../src/sweep.rs"]
+#[allow(dead_code)]
+mod sweep;
+
+use std::net::IpAddr;
+use std::time::Instant;
+use sweep::SweepRequest;
+use tokio::sync::{mpsc, oneshot};
+use tokio::time::Duration;
+
+// Deterministic "does this host answer, and how fast" for the stand-in
+async fn stand_in(ip: IpAddr, timeout: Duration) -> Option<u64> {
+    let hash = match ip {
+        IpAddr::V4(v4) => u32::from(v4).wrapping_mul(2654435761),
+        IpAddr::V6(v6) => (u128::from(v6) as u32).wrapping_mul(2654435761),
+    };
+    if hash % 8 == 0 {
+        let ms = 1 + (hash >> 8) as u64 % 20;
+        tokio::time::sleep(Duration::from_millis(ms)).await;
+        Some(ms)
+    } else {
+        tokio::time::sleep(timeout).await;
+        None
+    }
+}
+
+async fn bench<P, F>(label: &str, range: &str, concurrency: usize, timeout_ms: u64, probe: P)
+where
+    P: Fn(IpAddr, Duration) -> F,
+    F: std::future::Future<Output = Option<u64>> + Send + 'static,
+{
+    let targets = sweep::expand(&[range.to_string()]).unwrap();
+    let request = SweepRequest {
+        id: 1,
+        targets,
+        concurrency,
+        timeout: Duration::from_millis(timeout_ms),
+        include_dead: true,
+    };
+    let (events_tx, mut events_rx) = mpsc::unbounded_channel();
+    // Drain events the way a client connection would, serialized
+    let drain = tokio::spawn(async move {
+        let mut bytes = 0;
+        while let Some(event) = events_rx.recv().await {
+            bytes += serde_json::to_string(&event).map_or(0, |line| line.len() + 1);
+        }
+        bytes
+    });
+    let (_cancel_tx, cancel_rx) = oneshot::channel();
+    let started = Instant::now();
+    let summary = sweep::run(request, probe, events_tx, cancel_rx).await;
+    let elapsed = started.elapsed();
+    let bytes = drain.await.unwrap_or(0);
+    println!(
+        "{:<10} {:<16} {:>7} {:>11} {:>8}ms {:>9.2}s {:>10.0}/s {:>7} alive {:>6} KB streamed",
+        label,
+        range,
+        summary.total,
+        concurrency,
+        timeout_ms,
+        elapsed.as_secs_f64(),
+        summary.total as f64 / elapsed.as_secs_f64(),
+        summary.alive,
+        bytes / 1024,
+    );
+}
+
+#[tokio::main]
+async fn main() {
+    println!(
+        "{:<10} {:<16} {:>7} {:>11} {:>10} {:>10} {:>12}",
+        "stand-in", "range", "hosts", "concurrency", "timeout", "elapsed", "rate"
+    );
+    bench("simulated", "10.0.0.0/20", 50, 200, stand_in).await;
+    for concurrency in [256, 1024] {
+        bench("simulated", "10.0.0.0/16", concurrency, 200, stand_in).await;
+    }
+    for concurrency in [50, 256] {
+        bench("loopback", "127.0.0.0/22", concurrency, 1000, sweep::ping).await;
+    }
+}
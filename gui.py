@@ -7,17 +7,851 @@ from tkinter import ttk
 from ttkbootstrap import Style
 from ttkbootstrap.constants import *
 from tkinter import filedialog, messagebox, simpledialog
+from tkinter import font as tkfont
 import os
 import sys
+import argparse
 import subprocess
 import platform
 import time
 from collections import deque
 import queue
+import bisect
+import ipaddress
+import math
+from array import array
 from datetime import datetime
 
 BACKEND_HOST = '127.0.0.1'
 BACKEND_PORT = 7878
+BACKEND_START_TIMEOUT = 15  # s, for a backend started by the headless sweep to listen
+
+STATUS_LABELS = {
+    'critical': "🔴 Critical",
+    'warning': "🟡 Warning",
+    'good': "🟢 Good",
+    'perfect': "✅ Perfect",
+    'nodata': "⚪ No Data",
+    'waiting': "⚪ Waiting",
+}
+STATUS_RANK = {'critical': 3, 'warning': 2, 'good': 1, 'perfect': 0}
+SORTABLE_COLUMNS = ('ip', 'success', 'failure', 'total', 'disconnected', 'latency', 'last_ping', 'status')
+
+
+def ip_sort_key(ip):
+    """Numeric ordering for IPs (10.0.0.9 < 10.0.0.10); hostnames go last."""
+    try:
+        addr = ipaddress.ip_address(ip)
+        return (addr.version, int(addr), '')
+    except ValueError:
+        return (99, 0, ip)
+
+
+def stat_status(stat):
+    if stat is None:
+        return 'waiting'
+    total = stat['pass'] + stat['fail']
+    if total == 0:
+        return 'nodata'
+    fail_rate = stat['fail'] * 100 / total
+    if fail_rate > 50:
+        return 'critical'
+    elif fail_rate > 20:
+        return 'warning'
+    elif fail_rate > 0:
+        return 'good'
+    return 'perfect'
+
+
+def stat_metric(column, stat):
+    """Value used to order rows by `column`, or None when there is nothing to sort on."""
+    if stat is None:
+        return None
+    total = stat['pass'] + stat['fail']
+    if column == 'total':
+        return total
+    if column == 'disconnected':
+        return stat['disconnected_time']
+    if column == 'last_ping':
+        return stat['last_ping_time'] or None
+    if column == 'latency':
+        return stat.get('latency')
+    if column == 'status':
+        return STATUS_RANK.get(stat_status(stat))
+    if total == 0:
+        return None
+    if column == 'success':
+        return stat['pass'] * 100 / total
+    if column == 'failure':
+        return stat['fail'] * 100 / total
+    return None
+
+
+class StatsIndex:
+    """Per-IP stats kept in sorted order, updated one row at a time.
+
+    Every IP holds one entry in the overall order and one in the order of its
+    status bucket, so filtered and "top N" views never need a full sort.
+    Rows without data for the sort column always go last.
+    """
+
+    def __init__(self):
+        self.sort_column = 'ip'
+        self.descending = False
+        self._stats = {}
+        self._entries = {}
+        self._ip_keys = {}
+        self._status = {}
+        self._order = []
+        self._by_status = {status: [] for status in STATUS_LABELS}
+        self._names = []
+
+    def __len__(self):
+        return len(self._stats)
+
+    def __contains__(self, ip):
+        return ip in self._stats
+
+    def get(self, ip):
+        return self._stats.get(ip)
+
+    def count(self, status):
+        return len(self._by_status[status])
+
+    def _make_entry(self, ip, stat):
+        # Flat tuple ending in the IP itself; cheap to compare and unique
+        ip_key = self._ip_keys[ip]
+        if self.sort_column == 'ip':
+            return (0, 0) + ip_key + (ip,)
+        value = stat_metric(self.sort_column, stat)
+        if value is None:
+            return (1, 0) + ip_key + (ip,)
+        return (0, -value if self.descending else value) + ip_key + (ip,)
+
+    def _unlink(self, ip):
+        entry = self._entries.pop(ip)
+        for lst in (self._order, self._by_status[self._status.pop(ip)]):
+            del lst[bisect.bisect_left(lst, entry)]
+
+    def _link(self, ip, stat):
+        entry = self._make_entry(ip, stat)
+        status = stat_status(stat)
+        self._entries[ip] = entry
+        self._status[ip] = status
+        bisect.insort(self._order, entry)
+        bisect.insort(self._by_status[status], entry)
+
+    def _rebuild(self):
+        for lst in self._by_status.values():
+            lst.clear()
+        for ip, stat in self._stats.items():
+            entry = self._make_entry(ip, stat)
+            status = stat_status(stat)
+            self._entries[ip] = entry
+            self._status[ip] = status
+            self._by_status[status].append(entry)
+        for lst in self._by_status.values():
+            lst.sort()
+        self._order = sorted(self._entries.values())
+
+    def _add_name(self, ip):
+        bisect.insort(self._names, ip)
+        self._ip_keys[ip] = ip_sort_key(ip)
+
+    def update(self, ip, stat):
+        """Insert or refresh one IP. Returns False if nothing changed."""
+        if ip in self._stats:
+            old = self._stats[ip]
+            if old is stat or old == stat:
+                return False
+            self._unlink(ip)
+        else:
+            self._add_name(ip)
+        self._stats[ip] = stat
+        self._link(ip, stat)
+        return True
+
+    def update_many(self, stats):
+        """Apply a batch of updates, returns the IPs that changed.
+
+        When most of the table changed in one batch, a single re-sort of the
+        (already nearly ordered) lists is cheaper than moving rows one by one.
+        """
+        changed = [
+            (ip, stat) for ip, stat in stats.items()
+            if ip not in self._stats or self._stats[ip] != stat
+        ]
+        if len(changed) * 4 < len(self._stats):
+            for ip, stat in changed:
+                self.update(ip, stat)
+            return [ip for ip, _stat in changed]
+        new_names = [ip for ip, _stat in changed if ip not in self._stats]
+        for ip in new_names:
+            self._ip_keys[ip] = ip_sort_key(ip)
+        if new_names:
+            self._names.extend(new_names)
+            self._names.sort()
+        self._stats.update(changed)
+        self._rebuild()
+        return [ip for ip, _stat in changed]
+
+    def remove(self, ip):
+        if ip not in self._stats:
+            return
+        self._unlink(ip)
+        del self._stats[ip]
+        del self._ip_keys[ip]
+        del self._names[bisect.bisect_left(self._names, ip)]
+
+    def clear(self):
+        self._stats.clear()
+        self._entries.clear()
+        self._ip_keys.clear()
+        self._status.clear()
+        self._order.clear()
+        self._names.clear()
+        for lst in self._by_status.values():
+            lst.clear()
+
+    def set_sort(self, column, descending=False):
+        """Change the sort column; the only call that always re-sorts everything."""
+        if column == self.sort_column and descending == self.descending:
+            return
+        self.sort_column = column
+        self.descending = descending
+        self._rebuild()
+
+    def view(self, status=None, prefix='', limit=None, members=None):
+        """Return IPs in display order, filtered by status bucket and IP prefix.
+
+        `members` restricts the view to a set of IPs, e.g. one group.
+        """
+        if members is not None:
+            entries = sorted(
+                self._entries[ip] for ip in members
+                if ip.startswith(prefix) and (status is None or self._status[ip] == status)
+            )
+        elif prefix:
+            # Prefix matches are a contiguous range of the name list
+            lo = bisect.bisect_left(self._names, prefix)
+            hi = bisect.bisect_left(self._names, prefix + '\uffff')
+            entries = sorted(
+                self._entries[ip] for ip in self._names[lo:hi]
+                if status is None or self._status[ip] == status
+            )
+        else:
+            entries = self._order if status is None else self._by_status[status]
+
+        if self.sort_column == 'ip' and self.descending:
+            entries = reversed(entries)
+        result = []
+        for entry in entries:
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(entry[-1])
+        return result
+
+
+def subnet_of(ip, prefix=24):
+    """CIDR group of an IP: /prefix for IPv4, /64 (or /48 for prefixes under 24) for IPv6."""
+    parts = ip.split('.')
+    if len(parts) == 4 and all(part.isdigit() for part in parts):
+        if prefix >= 24:
+            return f"{parts[0]}.{parts[1]}.{parts[2]}.0/24"
+        return f"{parts[0]}.{parts[1]}.0.0/16"
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return 'Other'
+    return str(ipaddress.ip_network(f"{addr}/{64 if prefix >= 24 else 48}", strict=False))
+
+
+def group_sort_key(name):
+    try:
+        net = ipaddress.ip_network(name)
+        return (0, net.version, int(net.network_address), net.prefixlen, '')
+    except ValueError:
+        return (1, 0, 0, 0, name)
+
+
+class GroupRollups:
+    """Per-group aggregates, adjusted member by member as stats change.
+
+    Summaries have the same fields as the backend's "group" messages, so
+    group rows render the same way whichever side computed them.
+    """
+
+    def __init__(self):
+        self._groups = {}
+        self._group_of = {}
+        self._contributions = {}
+
+    def __contains__(self, group):
+        return group in self._groups
+
+    @staticmethod
+    def _contribution(stat):
+        if stat is None:
+            return (0, 0, 0, 0, 0, None)
+        probed = stat['last_ping_time'] > 0
+        latency = stat.get('latency')
+        return (
+            stat['pass'], stat['fail'], stat['disconnected_time'],
+            int(probed and latency is not None), int(probed and latency is None), latency,
+        )
+
+    @staticmethod
+    def _apply(agg, contribution, sign):
+        passed, failed, disconnected, up, down, latency = contribution
+        agg['pass'] += sign * passed
+        agg['fail'] += sign * failed
+        agg['disconnected_time'] += sign * disconnected
+        agg['up'] += sign * up
+        agg['down'] += sign * down
+        if latency is not None:
+            if sign > 0:
+                bisect.insort(agg['latencies'], latency)
+            else:
+                del agg['latencies'][bisect.bisect_left(agg['latencies'], latency)]
+
+    def assign(self, ip, group, stat):
+        """Add an IP to a group, moving it out of its previous one."""
+        self.remove(ip)
+        agg = self._groups.get(group)
+        if agg is None:
+            agg = self._groups[group] = {
+                'ips': set(), 'pass': 0, 'fail': 0, 'disconnected_time': 0,
+                'up': 0, 'down': 0, 'latencies': [],
+            }
+        agg['ips'].add(ip)
+        contribution = self._contribution(stat)
+        self._apply(agg, contribution, 1)
+        self._group_of[ip] = group
+        self._contributions[ip] = contribution
+
+    def update(self, ip, stat):
+        group = self._group_of.get(ip)
+        if group is None:
+            return
+        contribution = self._contribution(stat)
+        old = self._contributions[ip]
+        if contribution == old:
+            return
+        agg = self._groups[group]
+        self._apply(agg, old, -1)
+        self._apply(agg, contribution, 1)
+        self._contributions[ip] = contribution
+
+    def remove(self, ip):
+        group = self._group_of.pop(ip, None)
+        if group is None:
+            return
+        agg = self._groups[group]
+        self._apply(agg, self._contributions.pop(ip), -1)
+        agg['ips'].discard(ip)
+        if not agg['ips']:
+            del self._groups[group]
+
+    def clear(self):
+        self._groups.clear()
+        self._group_of.clear()
+        self._contributions.clear()
+
+    def names(self):
+        return list(self._groups)
+
+    def members(self, group):
+        return self._groups[group]['ips']
+
+    def membership(self):
+        return dict(self._group_of)
+
+    def summary(self, group):
+        agg = self._groups[group]
+        return {
+            'group': group,
+            'members': len(agg['ips']),
+            'up': agg['up'],
+            'down': agg['down'],
+            'pass': agg['pass'],
+            'fail': agg['fail'],
+            'disconnected_time': agg['disconnected_time'],
+            'worst_latency': agg['latencies'][-1] if agg['latencies'] else None,
+        }
+
+
+def group_metric(column, summary):
+    """Group counterpart of stat_metric, used to order group rows."""
+    total = summary['pass'] + summary['fail']
+    if column == 'total':
+        return total
+    if column == 'disconnected':
+        return summary['disconnected_time']
+    if column == 'latency':
+        return summary['worst_latency']
+    if column in ('status', 'last_ping'):
+        return summary['down']
+    if total == 0:
+        return None
+    if column == 'success':
+        return summary['pass'] * 100 / total
+    if column == 'failure':
+        return summary['fail'] * 100 / total
+    return None
+
+
+HISTORY_SECONDS = 24 * 3600
+TREND_SAMPLES = 120  # probes kept for the row sparkline of an IP without a chart
+TREND_MARGIN = 20  # rows above and below the viewport whose sparklines are kept current
+TREND_COLUMN = 8  # position of the Trend cell in a row's values
+MAX_CHARTS = 10
+CHART_SPANS = {'5 min': 300, '1 h': 3600, '6 h': 6 * 3600, '24 h': HISTORY_SECONDS}
+SPARK_BLOCKS = '▁▂▃▄▅▆▇█'
+
+
+class LatencyHistory:
+    """Probe results of one IP in two flat arrays: timestamps and latencies,
+    NaN for a failed probe.
+
+    Without a chart only the last TREND_SAMPLES probes are kept; a charted IP
+    (maxlen None) keeps up to HISTORY_SECONDS, a day of 1 s probes being about
+    1 MB. Old samples are dropped by moving `start` and compacted in bulk.
+    """
+
+    def __init__(self, maxlen=TREND_SAMPLES):
+        self.times = array('d')
+        self.values = array('f')
+        self.start = 0
+        self.maxlen = maxlen
+        self.added = 0  # samples ever appended, tells readers what is new
+        self.total = None  # pass + fail of the last stat seen
+        self.fail = 0
+
+    def __len__(self):
+        return len(self.times) - self.start
+
+    def record(self, stat):
+        """Append the stat's probe if it is one we have not seen yet.
+
+        A stat only carries the last probe, so probes that ran between two UI
+        updates are known from the counters alone. Their failures are kept,
+        spread over the gap; their latencies are lost.
+        """
+        total = stat['pass'] + stat['fail']
+        if total != self.total and stat['last_ping_time']:
+            latency = stat.get('latency')
+            t = stat['last_ping_time']
+            if len(self):
+                t = max(t, self.times[-1])
+            if self.total is not None and total > self.total:
+                missed = stat['fail'] - self.fail - (latency is None)
+                missed = min(missed, total - self.total - 1, self.maxlen or HISTORY_SECONDS)
+                if missed > 0:
+                    since = self.times[-1] if len(self) else t
+                    for i in range(1, missed + 1):
+                        self.times.append(since + (t - since) * i / (missed + 1))
+                        self.values.append(math.nan)
+                    self.added += missed
+            self.times.append(t)
+            self.values.append(math.nan if latency is None else latency)
+            self.added += 1
+            self._trim()
+        self.total = total
+        self.fail = stat['fail']
+
+    def set_maxlen(self, maxlen):
+        self.maxlen = maxlen
+        self._trim()
+
+    def _trim(self):
+        if not len(self):
+            return
+        start = self.start
+        if self.maxlen is not None:
+            start = max(start, len(self.times) - self.maxlen)
+        start = bisect.bisect_left(self.times, self.times[-1] - HISTORY_SECONDS, start)
+        if start >= 64 and start * 2 > len(self.times):
+            del self.times[:start]
+            del self.values[:start]
+            start = 0
+        self.start = start
+
+    def last(self):
+        return self.values[-1] if len(self) else None
+
+
+def sparkline(history, width):
+    """The last TREND_SAMPLES probes squeezed into `width` block characters.
+
+    Each character shows the worst latency of its share of probes, scaled to
+    the row's own peak; × marks a share that contains a failed probe.
+    """
+    values = history.values[max(history.start, len(history.values) - TREND_SAMPLES):]
+    count = len(values)
+    if not count:
+        return ''
+    width = min(width, count)
+    peak = max((ms for ms in values if ms == ms), default=0)
+    chars = []
+    for i in range(width):
+        chunk = values[i * count // width:(i + 1) * count // width]
+        if any(ms != ms for ms in chunk):
+            chars.append('×')
+        elif peak:
+            chars.append(SPARK_BLOCKS[min(7, int(max(chunk) * 8 / peak))])
+        else:
+            chars.append(SPARK_BLOCKS[0])
+    return ''.join(chars)
+
+
+def nice_scale(peak):
+    """Smallest 1/2/5 x 10^n ms above the peak with some headroom, at least 10."""
+    target = max(peak * 1.2, 10)
+    magnitude = 10 ** math.floor(math.log10(target))
+    for factor in (1, 2, 5, 10):
+        if factor * magnitude >= target:
+            return factor * magnitude
+
+
+class LatencyChart:
+    """Latency of one IP over a sliding window on a Tk canvas.
+
+    The window is cut into one bucket per pixel column and each column shows
+    the min/max latency of the probes in it, so the drawing cost depends on
+    the canvas width, not on how many probes the window holds. A full redraw
+    (resize, new window, taller scale) merges adjacent columns into a handful
+    of polylines. After that, each tick scrolls everything with one canvas
+    move, deletes what fell off the left edge and draws only the columns
+    that received probes.
+    """
+
+    MARGIN_LEFT = 52
+    MARGIN_RIGHT = 4
+    MARGIN_TOP = 16
+    MARGIN_BOTTOM = 4
+    LATE_SECONDS = 10  # probes may be reported this late; keep those columns separate
+
+    def __init__(self, canvas, ip, history, span, colors):
+        self.canvas = canvas
+        self.ip = ip
+        self.history = history
+        self.span = span
+        self.colors = colors
+        self.gap_seconds = 1.5  # join columns at most this far apart
+        self.items = deque()  # (first bucket, last bucket, item, end y), by last bucket
+        self.step = None  # seconds per column, None until drawn
+        self.bucket_now = 0
+        self.width = 0
+        self.seen = 0
+        self.scale = 10
+        self.last_label = None
+
+    def invalidate(self):
+        self.step = None
+
+    def _x(self, bucket):
+        return self.right - (self.bucket_now - bucket)
+
+    def _y(self, ms):
+        return self.bottom - min(ms, self.scale) * self.plot_height / self.scale
+
+    def _buckets(self, first, last):
+        """{bucket: [min, max, failed]} for the probes in buckets first..last."""
+        history, step = self.history, self.step
+        times, values = history.times, history.values
+        lo = bisect.bisect_left(times, first * step, history.start)
+        hi = bisect.bisect_left(times, (last + 1) * step, lo)
+        cells = {}
+        for i in range(lo, hi):
+            bucket = int(times[i] // step)
+            cell = cells.get(bucket)
+            if cell is None:
+                cell = cells[bucket] = [math.inf, -math.inf, False]
+            ms = values[i]
+            if ms != ms:
+                cell[2] = True
+            else:
+                if ms < cell[0]:
+                    cell[0] = ms
+                if ms > cell[1]:
+                    cell[1] = ms
+        return cells
+
+    def _last_point(self):
+        """(bucket, y) of the newest latency column still drawn, to join onto."""
+        if not self.items:
+            return None
+        newest = self.items[-1][1]
+        for _first, last, _item, end_y in reversed(self.items):
+            if last != newest:
+                break
+            if end_y is not None:
+                return (last, end_y)
+        return None
+
+    def _draw(self, cells, split):
+        """Draw the cells; columns from `split` on each get their own item so
+        the next tick can replace them without touching older ones."""
+        c = self.canvas
+        gap = max(1, math.ceil(self.gap_seconds / self.step))
+        new = []
+        prev = self._last_point()
+        points, first = [], None
+        fail_first = fail_last = None
+        for bucket in sorted(cells):
+            low, high, failed = cells[bucket]
+            if failed:
+                if fail_first is not None and (bucket != fail_last + 1 or bucket >= split):
+                    new.append(self._fail_bar(fail_first, fail_last))
+                    fail_first = None
+                if fail_first is None:
+                    fail_first = bucket
+                fail_last = bucket
+            if high < 0:
+                # Only failures here: the line breaks
+                if points:
+                    new.append(self._line(first, prev, points))
+                    points = []
+                prev = None
+                continue
+            x = self._x(bucket)
+            y_high = self._y(high)
+            y_low = max(self._y(low), y_high + 1)
+            joined = prev is not None and bucket - prev[0] <= gap
+            if points and (not joined or bucket >= split):
+                new.append(self._line(first, prev, points))
+                points = []
+            if not points:
+                first = bucket
+                if joined:
+                    points = [self._x(prev[0]), prev[1]]
+            points += [x, y_high, x, y_low]
+            prev = (bucket, y_low)
+        if points:
+            new.append(self._line(first, prev, points))
+        if fail_first is not None:
+            new.append(self._fail_bar(fail_first, fail_last))
+        new.sort(key=lambda entry: entry[1])
+        self.items.extend(new)
+
+    def _line(self, first, prev, points):
+        item = self.canvas.create_line(*points, fill=self.colors['line'], tags='plot')
+        return (first, prev[0], item, prev[1])
+
+    def _fail_bar(self, first, last):
+        item = self.canvas.create_rectangle(
+            self._x(first), self.bottom - 3, self._x(last) + 1, self.bottom + 1,
+            fill=self.colors['fail'], outline='', tags='plot'
+        )
+        return (first, last, item, None)
+
+    def _update_last(self):
+        last = self.history.last()
+        if last is None:
+            text = ''
+        elif last != last:
+            text = 'timeout'
+        else:
+            text = f'{last:.0f} ms'
+        self.canvas.itemconfigure(self.last_label, text=text)
+
+    def redraw(self, now):
+        c = self.canvas
+        c.delete('all')
+        self.items.clear()
+        self.step = None
+        width = c.winfo_width() - self.MARGIN_LEFT - self.MARGIN_RIGHT
+        height = c.winfo_height() - self.MARGIN_TOP - self.MARGIN_BOTTOM
+        if width < 10 or height < 10:
+            return  # not mapped yet, <Configure> brings us back
+        self.width = width
+        self.plot_height = height
+        self.right = self.MARGIN_LEFT + width - 1
+        self.bottom = self.MARGIN_TOP + height
+        self.step = self.span / width
+        self.bucket_now = int(now // self.step)
+        self.seen = self.history.added
+        
+        cells = self._buckets(self.bucket_now - width + 1, self.bucket_now)
+        self.scale = nice_scale(max((cell[1] for cell in cells.values()), default=0))
+        
+        colors = self.colors
+        c.configure(background=colors['bg'])
+        for ms in (self.scale / 2, self.scale):
+            y = self._y(ms)
+            c.create_line(self.MARGIN_LEFT, y, self.right + 1, y, fill=colors['grid'], dash=(2, 4))
+        c.create_line(self.MARGIN_LEFT, self.bottom, self.right + 1, self.bottom, fill=colors['grid'])
+        
+        self._draw(cells, self.bucket_now - math.ceil(self.LATE_SECONDS / self.step))
+        
+        # Drawn last so it covers polylines scrolling past the left edge
+        c.create_rectangle(0, 0, self.MARGIN_LEFT - 1, self.bottom + self.MARGIN_BOTTOM,
+                           fill=colors['bg'], outline='', tags='axis')
+        c.create_text(self.MARGIN_LEFT - 4, self._y(self.scale), text=f'{self.scale:g} ms',
+                      anchor='e', fill=colors['fg'], tags='axis')
+        c.create_text(self.MARGIN_LEFT - 4, self.bottom, text='0', anchor='e', fill=colors['fg'], tags='axis')
+        c.create_text(self.MARGIN_LEFT + 4, 1, text=self.ip, anchor='nw', fill=colors['fg'], tags='axis')
+        self.last_label = c.create_text(self.right, 1, anchor='ne', fill=colors['fg'], tags='axis')
+        self._update_last()
+
+    def advance(self, now):
+        """Scroll to `now` and draw only the columns that received probes."""
+        if self.step is None:
+            self.redraw(now)
+            return
+        c = self.canvas
+        bucket_now = int(now // self.step)
+        shift = bucket_now - self.bucket_now
+        if shift >= self.width:
+            self.redraw(now)
+            return
+        
+        doomed = []
+        if shift > 0:
+            c.move('plot', -shift, 0)
+            self.bucket_now = bucket_now
+            first = bucket_now - self.width + 1
+            while self.items and self.items[0][1] < first:
+                doomed.append(self.items.popleft()[2])
+        
+        history = self.history
+        fresh = min(history.added - self.seen, len(history))
+        self.seen = history.added
+        cells = None
+        if fresh > 0:
+            oldest = history.times[len(history.times) - fresh]
+            redraw_from = max(int(oldest // self.step), self.bucket_now - self.width + 1)
+            while self.items and self.items[-1][1] >= redraw_from:
+                item_first, _last, item, _end_y = self.items.pop()
+                doomed.append(item)
+                redraw_from = min(redraw_from, item_first)
+            cells = self._buckets(redraw_from, self.bucket_now)
+            if any(cell[1] > self.scale for cell in cells.values()):
+                self.redraw(now)
+                return
+        
+        if doomed:
+            c.delete(*doomed)
+        if cells:
+            self._draw(cells, redraw_from)
+            c.tag_raise('axis')
+        self._update_last()
+
+
+def find_backend():
+    """(path of the backend binary or None, the paths that were tried)"""
+    backend_name = "ping_check.exe" if platform.system() == "Windows" else "ping_check"
+    possible_paths = [
+        os.path.join(os.path.dirname(sys.executable), backend_name),
+        os.path.join(os.path.dirname(__file__), backend_name),
+        os.path.join(os.path.dirname(__file__), "target", "release", backend_name)
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path, possible_paths
+    return None, possible_paths
+
+
+def headless_sweep(targets, concurrency, timeout_ms, include_dead=False, as_json=False):
+    """Run one sweep through the backend without the GUI.
+
+    Responders go to stdout as they answer, progress and the summary to
+    stderr. A backend is started for the sweep if none is running, with
+    --no-state so it neither resumes nor overwrites the saved monitoring
+    state. Ctrl+C cancels the sweep and still prints what finished.
+    """
+    backend_process = None
+    sock = None
+    try:
+        try:
+            sock = socket.create_connection((BACKEND_HOST, BACKEND_PORT), timeout=2)
+        except OSError:
+            backend_path, possible_paths = find_backend()
+            if not backend_path:
+                print(f"Backend binary not found in: {possible_paths}", file=sys.stderr)
+                return 1
+            backend_process = subprocess.Popen(
+                [backend_path, '--no-state'],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+            # A cold start (or a virus scan of the binary) can take a while
+            deadline = time.monotonic() + BACKEND_START_TIMEOUT
+            while sock is None:
+                try:
+                    sock = socket.create_connection((BACKEND_HOST, BACKEND_PORT), timeout=2)
+                except OSError as e:
+                    if backend_process.poll() is not None or time.monotonic() > deadline:
+                        print(f"Cannot connect to the backend: {e}", file=sys.stderr)
+                        return 1
+                    time.sleep(0.2)
+        sock.settimeout(None)
+        
+        def send(payload):
+            sock.sendall((json.dumps(payload) + '\n').encode('utf-8'))
+        
+        # Only sweep events are wanted, not the periodic monitoring updates
+        send({'cmd': 'set_stream', 'quiet': True})
+        send({'cmd': 'sweep', 'targets': targets, 'concurrency': concurrency,
+              'timeout_ms': timeout_ms, 'include_dead': include_dead})
+        status = 0
+        progress = ''
+        reader = sock.makefile('r', encoding='utf-8')
+        while True:
+            try:
+                line = reader.readline()
+                if not line:
+                    print("Backend closed the connection", file=sys.stderr)
+                    status = 1
+                    break
+                if '"sweep_' not in line:
+                    continue  # the connect-time state and alerts
+                event = json.loads(line)
+                kind = event['event']
+                if progress and kind != 'sweep_progress':
+                    # Wipe the progress line before anything else is printed
+                    print('\r' + ' ' * len(progress) + '\r', end='', file=sys.stderr, flush=True)
+                    progress = ''
+                if kind == 'sweep_result':
+                    if as_json:
+                        print(line.strip(), flush=True)
+                    elif event['alive']:
+                        print(f"{event['ip']}\t{event['latency']} ms", flush=True)
+                    else:
+                        print(f"{event['ip']}\ttimeout", flush=True)
+                elif kind == 'sweep_progress':
+                    progress = f"{event['done']}/{event['total']} probed, {event['alive']} alive"
+                    print('\r' + progress, end='', file=sys.stderr, flush=True)
+                elif kind == 'sweep_error':
+                    print(f"Sweep failed: {event['message']}", file=sys.stderr)
+                    status = 1
+                    break
+                elif kind == 'sweep_done':
+                    note = ' (cancelled)' if event['cancelled'] else ''
+                    avg = f", avg {event['avg_latency']} ms" if event['avg_latency'] is not None else ''
+                    print(f"{event['alive']}/{event['total']} alive, {event['done']} probed in "
+                          f"{event['elapsed_ms']/1000:.1f}s{avg}{note}", file=sys.stderr)
+                    if as_json:
+                        print(line.strip(), flush=True)
+                    break
+            except KeyboardInterrupt:
+                send({'cmd': 'cancel_sweep'})
+        
+        if backend_process:
+            send({'cmd': 'shutdown'})
+            try:
+                backend_process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                pass
+        return status
+    finally:
+        if sock is not None:
+            sock.close()
+        # Whatever went wrong, do not leave a backend behind that we started
+        if backend_process and backend_process.poll() is None:
+            backend_process.terminate()
+
 
 class PingGUI:
     def __init__(self, root):
@@ -39,6 +873,29 @@ class PingGUI:
         self.recv_thread = None
         self.running = False
         self.ip_stats = {}
+        self.stats_index = StatsIndex()
+        self.rollups = GroupRollups()
+        self.group_mode = 'none'
+        self.ip_tags = {}
+        self.expanded_groups = set()
+        self.remote_groups = {}
+        self.group_buffer = {}
+        self.rendered_rows = {}
+        self.rendered_parent = {}
+        self.rendered_order = []
+        self.histories = {}
+        self.trend_cache = {}
+        self.trend_span = (0, 0)
+        self.trend_fill_pending = False
+        self.trend_chars = 12
+        self.charts = {}
+        self.chart_window = None
+        self.chart_redraw_pending = False
+        self.sweep_window = None
+        self.sweep_id = 0
+        self.sweep_alive = []
+        self.sweep_events = deque()
+        self.sweep_flush_pending = False
         self.interval = 1000
         self.backend_process = None
         
@@ -46,12 +903,15 @@ class PingGUI:
         self.last_table_update = 0
         self.update_interval = 1000
         self.stats_buffer = {}
+        self.alert_buffer = []
         self.update_pending = False
         
         self.message_count = 0
         self.last_message_time = time.time()
         
         self.selected_ips = {}
+        self.recent_alerts = deque(maxlen=200)
+        self.firing_alerts = set()
         self.connection_indicator = None  # Khởi tạo trước để tránh lỗi
         
         try:
@@ -74,19 +934,9 @@ class PingGUI:
 
     def start_backend(self):
         try:
-            backend_name = "ping_check.exe" if platform.system() == "Windows" else "ping_check"
-            possible_paths = [
-                os.path.join(os.path.dirname(sys.executable), backend_name),
-                os.path.join(os.path.dirname(__file__), backend_name),
-                os.path.join(os.path.dirname(__file__), "target", "release", backend_name)
-            ]
-            backend_path = None
-            for path in possible_paths:
-                if os.path.exists(path):
-                    backend_path = path
-                    break
+            backend_path, possible_paths = find_backend()
             if not backend_path:
-                messagebox.showerror("Error", f"Backend binary '{backend_name}' not found in: {possible_paths}")
+                messagebox.showerror("Error", f"Backend binary not found in: {possible_paths}")
                 self.root.destroy()
                 sys.exit(1)
             
@@ -278,6 +1128,14 @@ class PingGUI:
         )
         self.export_btn.pack(side=LEFT, padx=5)
         
+        self.reset_btn = ttk.Button(
+            row2, 
+            text='↺ Reset Stats', 
+            command=self.reset_stats,
+            bootstyle="secondary-outline"
+        )
+        self.reset_btn.pack(side=LEFT, padx=5)
+        
         self.open_folder_btn = ttk.Button(
             row2, 
             text='📂 Open Export Folder', 
@@ -286,7 +1144,87 @@ class PingGUI:
         )
         self.open_folder_btn.pack(side=LEFT, padx=5)
         
+        self.alerts_btn = ttk.Button(
+            row2, 
+            text='🔔 Alerts', 
+            command=self.show_alerts,
+            bootstyle="warning-outline"
+        )
+        self.alerts_btn.pack(side=LEFT, padx=5)
+        
+        self.charts_btn = ttk.Button(
+            row2, 
+            text='📈 Charts', 
+            command=self.show_charts,
+            bootstyle="info-outline"
+        )
+        self.charts_btn.pack(side=LEFT, padx=5)
+        
+        self.sweep_btn = ttk.Button(
+            row2, 
+            text='📡 Sweep', 
+            command=self.show_sweep,
+            bootstyle="secondary-outline"
+        )
+        self.sweep_btn.pack(side=LEFT, padx=5)
+        
         self._create_theme_menu(row2)
+        
+        row3 = ttk.Frame(control_frame)
+        row3.pack(fill=X, pady=(10, 0))
+        
+        ttk.Label(row3, text='Status:').pack(side=LEFT, padx=(0, 5))
+        self.status_filter_var = tk.StringVar(value='All')
+        self.status_filter_combo = ttk.Combobox(
+            row3,
+            textvariable=self.status_filter_var,
+            values=['All'] + [label.split(' ', 1)[1] for label in STATUS_LABELS.values()],
+            width=10,
+            state='readonly'
+        )
+        self.status_filter_combo.pack(side=LEFT, padx=5)
+        self.status_filter_combo.bind('<<ComboboxSelected>>', lambda event: self.update_table())
+        
+        ttk.Label(row3, text='Search IP:').pack(side=LEFT, padx=(10, 5))
+        self.search_var = tk.StringVar(value='')
+        self.search_entry = ttk.Entry(row3, textvariable=self.search_var, width=18)
+        self.search_entry.pack(side=LEFT, padx=5)
+        self.search_var.trace_add('write', lambda *args: self.update_table())
+        
+        ttk.Label(row3, text='Show:').pack(side=LEFT, padx=(10, 5))
+        self.row_limit_var = tk.StringVar(value='All')
+        self.row_limit_combo = ttk.Combobox(
+            row3,
+            textvariable=self.row_limit_var,
+            values=['All', '50', '100', '500', '1000'],
+            width=6,
+            state='readonly'
+        )
+        self.row_limit_combo.pack(side=LEFT, padx=5)
+        self.row_limit_combo.bind('<<ComboboxSelected>>', lambda event: self.update_table())
+        ttk.Label(row3, text='rows').pack(side=LEFT)
+        
+        ttk.Label(row3, text='Group by:').pack(side=LEFT, padx=(10, 5))
+        self.group_var = tk.StringVar(value='None')
+        self.group_combo = ttk.Combobox(
+            row3,
+            textvariable=self.group_var,
+            values=['None', 'Subnet /24', 'Subnet /16', 'Tag'],
+            width=10,
+            state='readonly'
+        )
+        self.group_combo.pack(side=LEFT, padx=5)
+        self.group_combo.bind('<<ComboboxSelected>>', self.on_group_mode_change)
+        
+        self.group_totals_var = tk.BooleanVar(value=False)
+        self.group_totals_check = ttk.Checkbutton(
+            row3,
+            text='Stream group totals only',
+            variable=self.group_totals_var,
+            command=self._sync_groups,
+            bootstyle="round-toggle"
+        )
+        self.group_totals_check.pack(side=LEFT, padx=5)
 
     def _create_theme_menu(self, parent):
         self.theme_var = tk.StringVar(value=self.current_theme)
@@ -333,7 +1271,7 @@ class PingGUI:
         table_frame = ttk.LabelFrame(parent, text="Ping Statistics", padding="10")
         table_frame.pack(fill=BOTH, expand=YES, pady=(0, 10))
         
-        self.columns = ('select', 'no', 'ip', 'success', 'failure', 'total', 'disconnected', 'last_ping', 'status')
+        self.columns = ('select', 'no', 'ip', 'success', 'failure', 'total', 'disconnected', 'latency', 'trend', 'last_ping', 'status')
         self.column_configs = {
             'select': {'text': 'Select', 'width': 60, 'anchor': tk.CENTER},
             'no': {'text': 'No.', 'width': 50, 'anchor': tk.CENTER},
@@ -342,6 +1280,8 @@ class PingGUI:
             'failure': {'text': 'Failure %', 'width': 80, 'anchor': tk.CENTER},
             'total': {'text': 'Total Pings', 'width': 80, 'anchor': tk.CENTER},
             'disconnected': {'text': 'Disconnected (s)', 'width': 120, 'anchor': tk.CENTER},
+            'latency': {'text': 'Latency (ms)', 'width': 90, 'anchor': tk.CENTER},
+            'trend': {'text': 'Trend', 'width': 110, 'anchor': tk.W},
             'last_ping': {'text': 'Last Ping', 'width': 150, 'anchor': tk.CENTER},
             'status': {'text': 'Status', 'width': 100, 'anchor': tk.CENTER},
         }
@@ -356,13 +1296,18 @@ class PingGUI:
         for col in self.columns:
             self.table.heading(col, text=self.column_configs[col]['text'], anchor=self.column_configs[col].get('anchor', tk.W))
             self.table.column(col, width=self.column_configs[col]['width'], anchor=self.column_configs[col].get('anchor', tk.W))
+            if col in SORTABLE_COLUMNS:
+                self.table.heading(col, command=lambda c=col: self.sort_by(c))
+        self._update_sort_headings()
         
-        scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.table.yview)
-        self.table.configure(yscrollcommand=scrollbar.set)
+        self.table_scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.table.yview)
+        self.table.configure(yscrollcommand=self._on_table_scroll)
         self.table.pack(side=LEFT, fill=BOTH, expand=YES)
-        scrollbar.pack(side=RIGHT, fill='y')
+        self.table_scrollbar.pack(side=RIGHT, fill='y')
         
         self.table.bind('<ButtonRelease-1>', self.handle_click)
+        # Pixel width of one sparkline character, to fit the Trend column
+        self.trend_char_px = max(1, tkfont.nametofont('TkDefaultFont').measure(SPARK_BLOCKS[-1]))
 
     def _create_status_bar(self, parent):
         status_frame = ttk.Frame(parent)
@@ -376,7 +1321,7 @@ class PingGUI:
         )
         self.status_label.pack(side=LEFT, fill=X, expand=YES)
         
-        self.count_var = tk.StringVar(value='IPs: 0 | Active: 0 | Failed: 0')
+        self.count_var = tk.StringVar(value='IPs: 0 | Active: 0 | Failed: 0 | Alerts: 0')
         self.count_label = ttk.Label(
             status_frame, 
             textvariable=self.count_var,
@@ -392,7 +1337,7 @@ class PingGUI:
                     
                     current_time = time.time() * 1000
                     if (current_time - self.last_table_update >= self.update_interval and 
-                        self.stats_buffer):
+                        (self.stats_buffer or self.group_buffer or self.alert_buffer)):
                         self.root.after(0, self.process_batch_updates)
                         self.last_table_update = current_time
                         
@@ -426,6 +1371,10 @@ class PingGUI:
         try:
             self.style.theme_use(theme_name)
             self.current_theme = theme_name
+            colors = self._chart_colors()
+            for chart in self.charts.values():
+                chart.colors = colors
+                self._invalidate_chart(chart)
             self.status_var.set(f'Theme changed to: {theme_name.title()}')
         except Exception as e:
             messagebox.showerror("Theme Error", f"Failed to change theme: {e}")
@@ -462,6 +1411,7 @@ class PingGUI:
             self.sock.settimeout(None)
             
             self.running = True
+            self.sweep_id = 0  # the backend numbers sweeps per connection
             self.recv_thread = threading.Thread(target=self.recv_loop, daemon=True)
             self.recv_thread.start()
             self.update_connection_status(True)
@@ -514,6 +1464,23 @@ class PingGUI:
         for msg in messages:
             try:
                 stat = json.loads(msg)
+                if stat.get('event') == 'alert':
+                    self.alert_buffer.append(stat)
+                    continue
+                if stat.get('event') == 'state':
+                    self.root.after(0, self.on_backend_state, stat)
+                    continue
+                if stat.get('event', '').startswith('sweep_'):
+                    # Results can arrive by the thousand; handled in batches
+                    self.sweep_events.append(stat)
+                    if not self.sweep_flush_pending:
+                        self.sweep_flush_pending = True
+                        self.root.after(100, self._flush_sweep_events)
+                    continue
+                if stat.get('event') == 'group':
+                    self.group_buffer[stat['group']] = stat
+                    self.message_count += 1
+                    continue
                 ip = stat['ip']
                 self.stats_buffer[ip] = stat
                 self.message_count += 1
@@ -521,13 +1488,411 @@ class PingGUI:
                 continue
 
     def process_batch_updates(self):
-        if not self.stats_buffer:
+        if not self.stats_buffer and not self.group_buffer and not self.alert_buffer:
             return
-            
-        self.ip_stats.update(self.stats_buffer)
+        
+        buffered = self.stats_buffer
+        self.stats_buffer = {}
+        groups = self.group_buffer
+        self.group_buffer = {}
+        alerts = self.alert_buffer
+        self.alert_buffer = []
+        self.remote_groups.update(groups)
+        if alerts:
+            self.on_alerts(alerts)
+        
+        known = {ip: stat for ip, stat in buffered.items() if ip in self.stats_index}
+        self.ip_stats.update(known)
+        changed = self.stats_index.update_many(known)
+        for ip in changed:
+            self.rollups.update(ip, known[ip])
+            history = self.histories.get(ip)
+            if history is None:
+                history = self.histories[ip] = LatencyHistory()
+            history.record(known[ip])
+        if changed or groups or alerts:
+            self.update_table()
+        if self.charts:
+            self._refresh_charts()
+
+    def on_backend_state(self, state):
+        """Merge the IP list the backend restored from its last snapshot."""
+        targets = set(state['targets'])
+        known = set(self.ip_list)
+        added = []
+        for ip in state['watchlist'] + state['targets']:
+            if ip not in known:
+                known.add(ip)
+                added.append(ip)
+        
+        for ip in added:
+            # Without a previous run, keep the usual "imported means selected"
+            self.selected_ips[ip] = ip in targets or not targets
+        self.ip_list.extend(added)
+        for ip, tag in state.get('tags', {}).items():
+            self.ip_tags.setdefault(ip, tag)
+        self._track_ips(added)
+        self._sync_groups()
+        
+        self.interval = state['interval']
+        self.interval_var.set(str(self.interval))
+        if state['monitoring']:
+            self.start_btn.config(state=DISABLED)
+            self.stop_btn.config(state=NORMAL)
+        if added:
+            self.status_var.set(f'Restored {len(added)} IPs from the previous session')
+        self.update_table()
+
+    def _sync_watchlist(self):
+        """Let the backend snapshot the full IP list, not just the monitored ones."""
+        tags = {ip: self.ip_tags[ip] for ip in self.ip_list if ip in self.ip_tags}
+        self._send({'cmd': 'set_watchlist', 'ips': self.ip_list, 'tags': tags})
+
+    def reset_stats(self):
+        if not messagebox.askyesno('Confirm', 'Reset the counters of all IPs?'):
+            return
+        if self.running and self.sock:
+            try:
+                msg = json.dumps({'cmd': 'reset'}) + '\n'
+                self.sock.sendall(msg.encode('utf-8'))
+            except Exception as e:
+                messagebox.showerror('Error', f'Failed to send reset command: {e}')
+                return
+        self.ip_stats.clear()
         self.stats_buffer.clear()
+        self.firing_alerts.clear()
+        self.stats_index.update_many({ip: None for ip in self.ip_list})
+        self._rebuild_groups()
+        self.status_var.set('Counters reset')
         self.update_table()
 
+    def on_alerts(self, alerts):
+        """Alerts pushed by the backend since the last batch, oldest first;
+        rules and sinks are configured in alerts.json."""
+        for alert in alerts:
+            key = (alert['ip'], alert['rule'])
+            if alert['state'] == 'firing':
+                self.firing_alerts.add(key)
+            else:
+                self.firing_alerts.discard(key)
+            self.recent_alerts.append(alert)
+        
+        alert = alerts[-1]
+        prefix = '🚨 ALERT' if alert['state'] == 'firing' else '✅ RESOLVED'
+        more = f' (+{len(alerts) - 1} more)' if len(alerts) > 1 else ''
+        self.status_var.set(f"{prefix}: {alert['message']}{more}")
+
+    def show_alerts(self):
+        if not self.recent_alerts:
+            messagebox.showinfo('Alerts', 'No alerts so far.')
+            return
+        lines = []
+        for alert in list(self.recent_alerts)[-20:]:
+            when = datetime.fromtimestamp(alert['timestamp']).strftime('%H:%M:%S')
+            lines.append(f"{when} [{alert['state']}] {alert['message']}")
+        messagebox.showinfo('Recent Alerts', '\n'.join(lines))
+
+    def _trend(self, ip):
+        history = self.histories.get(ip)
+        if history is None:
+            return ''
+        cached = self.trend_cache.get(ip)
+        if cached and cached[0] == history.added and cached[1] == self.trend_chars:
+            return cached[2]
+        text = sparkline(history, self.trend_chars)
+        self.trend_cache[ip] = (history.added, self.trend_chars, text)
+        return text
+
+    def _visible_span(self):
+        """Positions of the rendered rows in the viewport, plus a margin."""
+        shown = len(self.rendered_order)
+        first, last = self.table.yview()
+        if shown:
+            lo, hi = int(first * shown), math.ceil(last * shown)
+        else:
+            lo, hi = 0, self.table.winfo_height() // 16 + 1
+        return max(0, lo - TREND_MARGIN), hi + TREND_MARGIN
+
+    def _on_table_scroll(self, first, last):
+        self.table_scrollbar.set(first, last)
+        if not self.trend_fill_pending and self._visible_span() != self.trend_span:
+            self.trend_fill_pending = True
+            self.root.after_idle(self._fill_visible_trends)
+
+    def _fill_visible_trends(self):
+        """Sparklines are only kept current in and near the viewport; bring the
+        rows scrolled into view up to date."""
+        self.trend_fill_pending = False
+        lo, hi = self.trend_span = self._visible_span()
+        for iid, _parent in self.rendered_order[lo:hi]:
+            values = self.rendered_rows[iid]
+            if iid.startswith('group:'):
+                continue
+            trend = self._trend(iid)
+            if values[TREND_COLUMN] != trend:
+                self.table.set(iid, 'trend', trend)
+                self.rendered_rows[iid] = values[:TREND_COLUMN] + (trend,) + values[TREND_COLUMN + 1:]
+
+    def show_charts(self):
+        """Chart the highlighted rows (Ctrl/Shift-click for several), or the
+        top rows of the current view when nothing is highlighted."""
+        ips = [iid for iid in self.table.selection() if not iid.startswith('group:')]
+        if not ips:
+            ips = [iid for iid, _parent in self.rendered_order if not iid.startswith('group:')]
+        if not ips:
+            messagebox.showinfo('Charts', 'Please add some IPs first!')
+            return
+        if self.chart_window is None or not self.chart_window.winfo_exists():
+            self._create_chart_window()
+        self._set_chart_ips(ips[:MAX_CHARTS])
+        self.chart_window.lift()
+
+    def _create_chart_window(self):
+        self.chart_window = tk.Toplevel(self.root)
+        self.chart_window.title('Latency Charts')
+        self.chart_window.geometry('900x650')
+        self.chart_window.protocol('WM_DELETE_WINDOW', self._close_charts)
+        
+        bar = ttk.Frame(self.chart_window, padding="10")
+        bar.pack(fill=X)
+        ttk.Label(bar, text='Window:').pack(side=LEFT, padx=(0, 5))
+        self.chart_span_var = tk.StringVar(value='1 h')
+        span_combo = ttk.Combobox(
+            bar,
+            textvariable=self.chart_span_var,
+            values=list(CHART_SPANS),
+            width=6,
+            state='readonly'
+        )
+        span_combo.pack(side=LEFT, padx=5)
+        span_combo.bind('<<ComboboxSelected>>', self.on_chart_span_change)
+        ttk.Button(
+            bar,
+            text='📈 Chart Selected Rows',
+            command=self.show_charts,
+            bootstyle="info-outline"
+        ).pack(side=LEFT, padx=5)
+        ttk.Label(
+            bar,
+            text=f'Up to {MAX_CHARTS} IPs; history starts with their recent trend',
+            font=('Segoe UI', 8)
+        ).pack(side=LEFT, padx=10)
+        
+        self.chart_frame = ttk.Frame(self.chart_window, padding=(10, 0, 10, 10))
+        self.chart_frame.pack(fill=BOTH, expand=YES)
+
+    def _set_chart_ips(self, ips):
+        for chart in self.charts.values():
+            chart.canvas.destroy()
+            if chart.ip not in ips:
+                chart.history.set_maxlen(TREND_SAMPLES)
+        self.charts = {}
+        
+        span = CHART_SPANS[self.chart_span_var.get()]
+        colors = self._chart_colors()
+        for ip in ips:
+            history = self.histories.get(ip)
+            if history is None:
+                history = self.histories[ip] = LatencyHistory()
+            history.set_maxlen(None)
+            canvas = tk.Canvas(self.chart_frame, height=50, highlightthickness=0, background=colors['bg'])
+            canvas.pack(fill=BOTH, expand=YES, pady=2)
+            chart = LatencyChart(canvas, ip, history, span, colors)
+            canvas.bind('<Configure>', lambda event, chart=chart: self._invalidate_chart(chart))
+            self.charts[ip] = chart
+
+    def _chart_colors(self):
+        colors = self.style.colors
+        return {'bg': colors.bg, 'fg': colors.fg, 'line': colors.info, 'fail': colors.danger, 'grid': colors.border}
+
+    def _invalidate_chart(self, chart):
+        """Full redraw on the next idle moment, once for any number of charts."""
+        chart.invalidate()
+        if not self.chart_redraw_pending:
+            self.chart_redraw_pending = True
+            self.root.after_idle(self._refresh_charts)
+
+    def _refresh_charts(self):
+        self.chart_redraw_pending = False
+        now = time.time()
+        gap = self.interval * 1.5 / 1000
+        for chart in self.charts.values():
+            chart.gap_seconds = gap
+            chart.advance(now)
+
+    def on_chart_span_change(self, event=None):
+        span = CHART_SPANS[self.chart_span_var.get()]
+        for chart in self.charts.values():
+            chart.span = span
+            self._invalidate_chart(chart)
+
+    def _close_charts(self):
+        for chart in self.charts.values():
+            chart.history.set_maxlen(TREND_SAMPLES)
+        self.charts = {}
+        self.chart_window.destroy()
+        self.chart_window = None
+
+    def show_sweep(self):
+        if self.sweep_window is not None and self.sweep_window.winfo_exists():
+            self.sweep_window.lift()
+            return
+        self.sweep_window = tk.Toplevel(self.root)
+        self.sweep_window.title('Reachability Sweep')
+        self.sweep_window.geometry('560x520')
+        
+        frame = ttk.Frame(self.sweep_window, padding="10")
+        frame.pack(fill=BOTH, expand=YES)
+        
+        row1 = ttk.Frame(frame)
+        row1.pack(fill=X)
+        ttk.Label(row1, text='Targets:').pack(side=LEFT, padx=(0, 5))
+        self.sweep_targets_var = tk.StringVar(value='192.168.1.0/24')
+        ttk.Entry(row1, textvariable=self.sweep_targets_var).pack(side=LEFT, fill=X, expand=YES, padx=5)
+        
+        row2 = ttk.Frame(frame)
+        row2.pack(fill=X, pady=(10, 0))
+        ttk.Label(row2, text='In flight:').pack(side=LEFT, padx=(0, 5))
+        self.sweep_concurrency_var = tk.StringVar(value='256')
+        ttk.Combobox(
+            row2,
+            textvariable=self.sweep_concurrency_var,
+            values=['50', '128', '256', '512', '1024'],
+            width=6
+        ).pack(side=LEFT, padx=5)
+        ttk.Label(row2, text='Timeout:').pack(side=LEFT, padx=(10, 5))
+        self.sweep_timeout_var = tk.StringVar(value='1000')
+        ttk.Combobox(
+            row2,
+            textvariable=self.sweep_timeout_var,
+            values=['200', '500', '1000', '2000'],
+            width=6
+        ).pack(side=LEFT, padx=5)
+        ttk.Label(row2, text='ms').pack(side=LEFT)
+        ttk.Button(row2, text='■ Cancel', command=self.cancel_sweep, bootstyle="danger-outline").pack(side=RIGHT, padx=5)
+        ttk.Button(row2, text='▶ Sweep', command=self.start_sweep, bootstyle="success").pack(side=RIGHT, padx=5)
+        
+        self.sweep_progress = ttk.Progressbar(frame, mode='determinate', bootstyle="success-striped")
+        self.sweep_progress.pack(fill=X, pady=(10, 0))
+        self.sweep_status_var = tk.StringVar(value='CIDR ranges or IPs, separated by commas or spaces')
+        ttk.Label(frame, textvariable=self.sweep_status_var, font=('Segoe UI', 9)).pack(fill=X, pady=5)
+        
+        self.sweep_table = ttk.Treeview(frame, columns=('ip', 'latency'), show='headings', height=12)
+        self.sweep_table.heading('ip', text='Responding IP', anchor=tk.W)
+        self.sweep_table.heading('latency', text='Latency (ms)', anchor=tk.CENTER)
+        self.sweep_table.column('ip', width=300, anchor=tk.W)
+        self.sweep_table.column('latency', width=120, anchor=tk.CENTER)
+        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=self.sweep_table.yview)
+        self.sweep_table.configure(yscrollcommand=scrollbar.set)
+        ttk.Button(
+            frame,
+            text='➕ Add Responders to IP List',
+            command=self.add_sweep_results,
+            bootstyle="info-outline"
+        ).pack(side=BOTTOM, fill=X, pady=(5, 0))
+        self.sweep_table.pack(side=LEFT, fill=BOTH, expand=YES)
+        scrollbar.pack(side=RIGHT, fill='y')
+
+    def start_sweep(self):
+        targets = self.sweep_targets_var.get().replace(',', ' ').split()
+        if not targets:
+            messagebox.showwarning('Warning', 'Please enter a range or some IPs to sweep!', parent=self.sweep_window)
+            return
+        try:
+            concurrency = int(self.sweep_concurrency_var.get())
+            timeout_ms = int(self.sweep_timeout_var.get())
+        except ValueError:
+            messagebox.showwarning('Warning', 'In flight and timeout must be numbers!', parent=self.sweep_window)
+            return
+        if not self.running:
+            try:
+                self.connect_backend()
+            except Exception as e:
+                messagebox.showerror('Error', f'Cannot connect to backend: {e}', parent=self.sweep_window)
+                return
+        
+        self.sweep_id += 1
+        self.sweep_alive = []
+        self.sweep_table.delete(*self.sweep_table.get_children())
+        self.sweep_progress.config(value=0)
+        self.sweep_status_var.set('Expanding targets...')
+        self._send({'cmd': 'sweep', 'targets': targets, 'concurrency': concurrency, 'timeout_ms': timeout_ms})
+
+    def cancel_sweep(self):
+        self._send({'cmd': 'cancel_sweep'})
+
+    def _flush_sweep_events(self):
+        self.sweep_flush_pending = False
+        events = []
+        while self.sweep_events:
+            events.append(self.sweep_events.popleft())
+        if self.sweep_window is None or not self.sweep_window.winfo_exists():
+            return
+        
+        progress = None
+        for event in events:
+            if event['id'] != self.sweep_id:
+                continue  # left over from a sweep that was replaced
+            kind = event['event']
+            if kind == 'sweep_started':
+                self.sweep_progress.config(maximum=max(1, event['total']))
+                self.sweep_status_var.set(f"Probing {event['total']} addresses, {event['concurrency']} at a time...")
+            elif kind == 'sweep_result':
+                if event['alive']:
+                    self.sweep_alive.append(event['ip'])
+                    self.sweep_table.insert('', 'end', values=(event['ip'], event['latency']))
+                progress = (event['done'], event['total'])
+            elif kind == 'sweep_progress':
+                progress = (event['done'], event['total'])
+            elif kind == 'sweep_error':
+                self.sweep_status_var.set(f"Sweep failed: {event['message']}")
+            elif kind == 'sweep_done':
+                progress = None
+                self.sweep_progress.config(value=event['done'])
+                note = ' (cancelled)' if event['cancelled'] else ''
+                avg = f", avg {event['avg_latency']} ms" if event['avg_latency'] is not None else ''
+                summary = (f"{event['alive']}/{event['total']} alive, {event['done']} probed in "
+                           f"{event['elapsed_ms']/1000:.1f}s{avg}{note}")
+                self.sweep_status_var.set(summary)
+                self.status_var.set(f'Sweep: {summary}')
+        if progress:
+            done, total = progress
+            self.sweep_progress.config(value=done)
+            self.sweep_status_var.set(f'{done}/{total} probed, {len(self.sweep_alive)} alive')
+
+    def add_sweep_results(self):
+        known = set(self.ip_list)
+        new_ips = [ip for ip in self.sweep_alive if ip not in known]
+        if not new_ips:
+            messagebox.showinfo('Info', 'No new responding IPs to add.', parent=self.sweep_window)
+            return
+        for ip in new_ips:
+            self.selected_ips[ip] = True
+        self.ip_list.extend(new_ips)
+        self._track_ips(new_ips)
+        self.status_var.set(f'Added {len(new_ips)} IPs from the sweep. Total: {len(self.ip_list)}')
+        self._sync_watchlist()
+        self._sync_groups()
+        self.update_table()
+
+    def sort_by(self, column):
+        """Heading click: sort by column, clicking again flips the direction."""
+        if self.stats_index.sort_column == column:
+            descending = not self.stats_index.descending
+        else:
+            # Numbers read best worst-first, the IP column in natural order
+            descending = column != 'ip'
+        self.stats_index.set_sort(column, descending)
+        self._update_sort_headings()
+        self.update_table()
+
+    def _update_sort_headings(self):
+        for col in SORTABLE_COLUMNS:
+            text = self.column_configs[col]['text']
+            if col == self.stats_index.sort_column:
+                text += ' ▼' if self.stats_index.descending else ' ▲'
+            self.table.heading(col, text=text)
+
     def toggle_checkbox(self, event, item, ip):
         try:
             self.selected_ips[ip] = not self.selected_ips.get(ip, False)
@@ -541,13 +1906,18 @@ class PingGUI:
             if not item:
                 return
             
+            if item.startswith('group:'):
+                self.toggle_group(item[len('group:'):])
+                return
+            
             column = self.table.identify_column(event.x)
             values = self.table.item(item, 'values')
             ip = values[2]
             
             if column == '#1':
                 self.toggle_checkbox(event, item, ip)
-            else:
+            elif not event.state & 0x0005:
+                # Shift/Ctrl-click keeps extending the selection for charts
                 self.table.selection_set(item)
         except Exception:
             pass
@@ -564,63 +1934,242 @@ class PingGUI:
         self.update_table()
         self.status_var.set('Unselected all IPs')
 
+    def _row_values(self, idx, ip):
+        stat = self.stats_index.get(ip)
+        checkbox = '☑' if self.selected_ips.get(ip, False) else '☐'
+        status = STATUS_LABELS[stat_status(stat)]
+        trend = None  # filled in by update_table for rows in view
+        if stat is None:
+            return (checkbox, idx, ip, 'N/A', 'N/A', 0, '0.0', 'N/A', trend, 'N/A', status)
+        
+        total = stat['pass'] + stat['fail']
+        if total > 0:
+            percent_pass = f"{(stat['pass']*100/total):.1f}%"
+            percent_fail = f"{(stat['fail']*100/total):.1f}%"
+        else:
+            percent_pass = percent_fail = 'N/A'
+        
+        disconnected = f"{stat['disconnected_time']/1000:.1f}"
+        latency = stat.get('latency')
+        latency = latency if latency is not None else 'N/A'
+        last_ping = datetime.fromtimestamp(stat['last_ping_time']).strftime('%Y-%m-%d %H:%M:%S') if stat['last_ping_time'] else 'N/A'
+        return (checkbox, idx, ip, percent_pass, percent_fail, total, disconnected, latency, trend, last_ping, status)
+
+    def _view_filters(self):
+        status = None
+        label = self.status_filter_var.get()
+        for key, status_label in STATUS_LABELS.items():
+            if status_label.endswith(' ' + label):
+                status = key
+        try:
+            limit = int(self.row_limit_var.get())
+        except ValueError:
+            limit = None
+        return {'status': status, 'prefix': self.search_var.get().strip(), 'limit': limit}
+
+    def _groups_only(self):
+        """Whether the backend streams group totals instead of every IP."""
+        return self.group_mode != 'none' and self.group_totals_var.get()
+
+    def _group_summary(self, name):
+        # With group totals streamed, members of collapsed groups get no
+        # updates, so the backend's rollup is the one to trust
+        if self._groups_only() and name in self.remote_groups:
+            return self.remote_groups[name]
+        return self.rollups.summary(name)
+
+    def _group_values(self, name, summary):
+        total = summary['pass'] + summary['fail']
+        if total > 0:
+            availability = f"{summary['pass']*100/total:.1f}%"
+            failure = f"{summary['fail']*100/total:.1f}%"
+        else:
+            availability = failure = 'N/A'
+        worst = summary['worst_latency']
+        if summary['down']:
+            status = f"🔴 {summary['down']} down"
+        elif summary['up']:
+            status = "🟢 All up"
+        else:
+            status = STATUS_LABELS['nodata']
+        toggle = '▼' if name in self.expanded_groups else '▶'
+        return (
+            toggle, '', f"{name} ({summary['members']} IPs)", availability, failure, total,
+            f"{summary['disconnected_time']/1000:.1f}", worst if worst is not None else 'N/A', '',
+            f"{summary['up']} up / {summary['down']} down", status,
+        )
+
+    def _table_rows(self):
+        """Rows to display as (iid, parent, values), in order."""
+        filters = self._view_filters()
+        if self.group_mode == 'none':
+            return [
+                (ip, '', self._row_values(pos, ip))
+                for pos, ip in enumerate(self.stats_index.view(**filters), 1)
+            ]
+        
+        summaries = {name: self._group_summary(name) for name in self.rollups.names()}
+        column = self.stats_index.sort_column
+        descending = self.stats_index.descending
+        
+        def order(name):
+            value = None if column == 'ip' else group_metric(column, summaries[name])
+            if value is None:
+                return (1, 0, group_sort_key(name))
+            return (0, -value if descending else value, group_sort_key(name))
+        
+        names = sorted(summaries, key=order, reverse=(column == 'ip' and descending))
+        # A status filter or search shows the groups that have a matching
+        # member; both are off while only group totals are streamed
+        filtering = filters['status'] is not None or filters['prefix']
+        rows = []
+        for name in names:
+            expanded = name in self.expanded_groups
+            members = None
+            if expanded or filtering:
+                members = self.stats_index.view(members=self.rollups.members(name), **filters)
+                if filtering and not members:
+                    continue
+            group_iid = 'group:' + name
+            rows.append((group_iid, '', self._group_values(name, summaries[name])))
+            if expanded:
+                for pos, ip in enumerate(members, 1):
+                    rows.append((ip, group_iid, self._row_values(pos, ip)))
+        return rows
+
     def update_table(self):
+        """Bring the table in line with the index, touching only rows that differ."""
         try:
-            scroll_pos = self.table.yview()[0]
-            
-            for item in self.table.get_children():
-                self.table.delete(item)
+            self.trend_chars = max(1, int(self.table.column('trend', 'width')) // self.trend_char_px)
+            rows = self._table_rows()
             
-            rows = []
-            failed_count = 0
-            
-            for idx, (ip, stat) in enumerate(self.ip_stats.items(), 1):
-                total = stat['pass'] + stat['fail']
-                if total > 0:
-                    percent_pass = f"{(stat['pass']*100/total):.1f}%"
-                    percent_fail = f"{(stat['fail']*100/total):.1f}%"
-                    fail_rate = (stat['fail']*100/total)
-                    
-                    if fail_rate > 50:
-                        status = "🔴 Critical"
-                        failed_count += 1
-                    elif fail_rate > 20:
-                        status = "🟡 Warning"
-                    elif fail_rate > 0:
-                        status = "🟢 Good"
-                    else:
-                        status = "✅ Perfect"
+            # Sparklines are the costly cells: draw them for rows in view,
+            # leave the rest as rendered until they are scrolled to
+            lo, hi = self.trend_span = self._visible_span()
+            for i, (iid, parent, values) in enumerate(rows):
+                if values[TREND_COLUMN] is not None:
+                    continue
+                if lo <= i < hi:
+                    trend = self._trend(iid)
                 else:
-                    percent_pass = percent_fail = 'N/A'
-                    status = "⚪ No Data"
-                
-                disconnected = f"{stat['disconnected_time']/1000:.1f}"
-                last_ping = datetime.fromtimestamp(stat['last_ping_time']).strftime('%Y-%m-%d %H:%M:%S') if stat['last_ping_time'] else 'N/A'
-                checkbox = '☑' if self.selected_ips.get(ip, False) else '☐'
-                row = (checkbox, idx, ip, percent_pass, percent_fail, total, disconnected, last_ping, status)
-                rows.append(row)
+                    rendered = self.rendered_rows.get(iid)
+                    trend = rendered[TREND_COLUMN] if rendered else ''
+                rows[i] = (iid, parent, values[:TREND_COLUMN] + (trend,) + values[TREND_COLUMN + 1:])
+            order = [(iid, parent) for iid, parent, _values in rows]
+            reordered = order != self.rendered_order
+            parents = dict(order)
             
-            for ip in self.ip_list:
-                if ip not in self.ip_stats:
-                    idx = len(rows) + 1
-                    checkbox = '☑' if self.selected_ips.get(ip, False) else '☐'
-                    rows.append((checkbox, idx, ip, 'N/A', 'N/A', 0, '0.0', 'N/A', '⚪ Waiting'))
+            stale = [iid for iid in self.rendered_rows if parents.get(iid) != self.rendered_parent[iid]]
+            if stale:
+                # Deleting a group row takes its member rows with it
+                stale_set = set(stale)
+                self.table.delete(*[iid for iid in stale if self.rendered_parent[iid] not in stale_set])
+                for iid in stale:
+                    del self.rendered_rows[iid]
+                    del self.rendered_parent[iid]
             
-            rows.sort(key=lambda x: x[2])
-            rows = [(row[0], i+1, *row[2:]) for i, row in enumerate(rows)]
-            
-            for row in rows:
-                self.table.insert('', 'end', values=row)
-            
-            self.table.yview_moveto(scroll_pos)
+            for iid, parent, values in rows:
+                if iid not in self.rendered_rows:
+                    self.table.insert(parent, 'end', iid=iid, values=values, open=True)
+                elif self.rendered_rows[iid] != values:
+                    self.table.item(iid, values=values)
+                self.rendered_rows[iid] = values
+                self.rendered_parent[iid] = parent
+
+            if reordered:
+                # Compare child lists per parent against what was rendered and
+                # hand each changed one to Tk in a single call, instead of
+                # asking Tk for every row's position
+                children, rendered_children = {}, {}
+                for iid, parent in order:
+                    children.setdefault(parent, []).append(iid)
+                for iid, parent in self.rendered_order:
+                    rendered_children.setdefault(parent, []).append(iid)
+                for parent, iids in children.items():
+                    if iids != rendered_children.get(parent):
+                        self.table.set_children(parent, *iids)
+            self.rendered_order = order
             
-            active_count = len(self.ip_stats)
             total_count = len(self.ip_list)
-            self.count_var.set(f'IPs: {total_count} | Active: {active_count} | Failed: {failed_count}')
+            alert_count = len(self.firing_alerts)
+            if self._groups_only():
+                # Per-IP stats of collapsed groups are stale, count from the totals
+                summaries = [self._group_summary(name) for name in self.rollups.names()]
+                active_count = sum(summary['up'] + summary['down'] for summary in summaries)
+                down_count = sum(summary['down'] for summary in summaries)
+                self.count_var.set(f'IPs: {total_count} | Active: {active_count} | Down: {down_count} | Alerts: {alert_count}')
+            else:
+                active_count = len(self.ip_stats)
+                failed_count = self.stats_index.count('critical')
+                self.count_var.set(f'IPs: {total_count} | Active: {active_count} | Failed: {failed_count} | Alerts: {alert_count}')
             
         except Exception as e:
             print(f"Table update error: {e}")
 
+    def group_of(self, ip):
+        if self.group_mode == 'tag':
+            return self.ip_tags.get(ip, 'Untagged')
+        return subnet_of(ip, 16 if self.group_mode == 'subnet16' else 24)
+
+    def _track_ips(self, ips):
+        """Add new IPs (no stats yet) to the index and, when grouping, to their group."""
+        self.stats_index.update_many({ip: None for ip in ips})
+        if self.group_mode != 'none':
+            for ip in ips:
+                self.rollups.assign(ip, self.group_of(ip), None)
+
+    def _rebuild_groups(self):
+        self.rollups.clear()
+        self.remote_groups.clear()
+        if self.group_mode != 'none':
+            for ip in self.ip_list:
+                self.rollups.assign(ip, self.group_of(ip), self.stats_index.get(ip))
+        self.expanded_groups &= set(self.rollups.names())
+
+    def on_group_mode_change(self, event=None):
+        modes = {'None': 'none', 'Subnet /24': 'subnet24', 'Subnet /16': 'subnet16', 'Tag': 'tag'}
+        self.group_mode = modes.get(self.group_var.get(), 'none')
+        self.expanded_groups.clear()
+        self._rebuild_groups()
+        self._sync_groups()
+        self.update_table()
+
+    def toggle_group(self, name):
+        if name in self.expanded_groups:
+            self.expanded_groups.discard(name)
+        else:
+            self.expanded_groups.add(name)
+        self._sync_stream()
+        self.update_table()
+
+    def _send(self, payload):
+        if not self.running or not self.sock:
+            return
+        try:
+            self.sock.sendall((json.dumps(payload) + '\n').encode('utf-8'))
+        except Exception as e:
+            print(f"Send error: {e}")
+
+    def _sync_stream(self):
+        self._send({'cmd': 'set_stream', 'groups_only': self._groups_only(), 'expanded': sorted(self.expanded_groups)})
+
+    def _sync_groups(self):
+        """Give the backend the group membership when it should stream group totals."""
+        groups_only = self._groups_only()
+        if groups_only:
+            self._send({'cmd': 'set_groups', 'groups': self.rollups.membership()})
+        self.remote_groups.clear()
+        self._sync_stream()
+        
+        # Status and search work on per-IP stats, which only expanded groups
+        # keep receiving while group totals are streamed
+        if groups_only:
+            self.status_filter_var.set('All')
+            if self.search_var.get():
+                self.search_var.set('')
+        self.status_filter_combo.config(state=DISABLED if groups_only else 'readonly')
+        self.search_entry.config(state=DISABLED if groups_only else NORMAL)
+
     def start_monitor(self):
         if not self.ip_list:
             messagebox.showwarning('Warning', 'Please add some IPs first!')
@@ -640,10 +2189,12 @@ class PingGUI:
         
         self.ip_stats.clear()
         self.stats_buffer.clear()
+        self.ip_list = list(dict.fromkeys(self.ip_list))
+        self.stats_index.clear()
+        self.stats_index.update_many({ip: None for ip in self.ip_list})
+        self._rebuild_groups()
         self.update_table()
         
-        self.ip_list = list(set(self.ip_list))
-        
         try:
             interval = int(self.interval_var.get())
         except ValueError:
@@ -651,6 +2202,8 @@ class PingGUI:
             self.interval_var.set('1000')
         
         self.interval = interval
+        self._sync_watchlist()
+        self._sync_groups()
         
         msg = json.dumps({
             'cmd': 'start',
@@ -675,6 +2228,8 @@ class PingGUI:
             except Exception as e:
                 print(f"Error stopping monitor: {e}")
         
+        # Stopped tasks never send their resolve events
+        self.firing_alerts.clear()
         self.start_btn.config(state=NORMAL)
         self.stop_btn.config(state=DISABLED)
         self.status_var.set('Monitoring stopped')
@@ -688,16 +2243,29 @@ class PingGUI:
             return
         
         try:
+            known = set(self.ip_list)
+            new_ips = []
             with open(path, 'r') as f:
-                imported_count = 0
                 for line in f:
-                    ip = line.strip()
-                    if ip and ip not in self.ip_list:
-                        self.ip_list.append(ip)
+                    # "ip" or "ip,tag" / "ip tag" to put the IP in a site group
+                    parts = line.replace(',', ' ').split(None, 1)
+                    if not parts:
+                        continue
+                    ip = parts[0]
+                    if len(parts) > 1:
+                        self.ip_tags[ip] = parts[1].strip()
+                    if ip not in known:
+                        known.add(ip)
+                        new_ips.append(ip)
                         self.selected_ips[ip] = True
-                        imported_count += 1
+            self.ip_list.extend(new_ips)
+            self._track_ips(new_ips)
+            if self.group_mode == 'tag':
+                self._rebuild_groups()
             
-            self.status_var.set(f'Imported {imported_count} new IPs. Total: {len(self.ip_list)}')
+            self.status_var.set(f'Imported {len(new_ips)} new IPs. Total: {len(self.ip_list)}')
+            self._sync_watchlist()
+            self._sync_groups()
             self.update_table()
         except Exception as e:
             messagebox.showerror('Error', f'Failed to import IPs: {e}')
@@ -724,7 +2292,10 @@ class PingGUI:
             if ip not in self.ip_list:
                 self.ip_list.append(ip)
                 self.selected_ips[ip] = True
+                self._track_ips([ip])
                 self.status_var.set(f'Added {ip}. Total: {len(self.ip_list)}')
+                self._sync_watchlist()
+                self._sync_groups()
                 self.update_table()
             else:
                 messagebox.showinfo('Info', f'IP {ip} already exists in the list!')
@@ -742,8 +2313,16 @@ class PingGUI:
                     self.ip_stats.pop(ip, None)
                     self.stats_buffer.pop(ip, None)
                     self.selected_ips.pop(ip, None)
+                    self.ip_tags.pop(ip, None)
+                    self.histories.pop(ip, None)
+                    self.trend_cache.pop(ip, None)
+                    self.stats_index.remove(ip)
+                    self.rollups.remove(ip)
+            self.firing_alerts = {key for key in self.firing_alerts if key[0] in self.stats_index}
             
             self.status_var.set(f'Removed {len(selected_ips)} IPs. Total: {len(self.ip_list)}')
+            self._sync_watchlist()
+            self._sync_groups()
             self.update_table()
         except Exception as e:
             messagebox.showerror('Error', f'Failed to remove IPs: {e}')
@@ -759,12 +2338,33 @@ class PingGUI:
             self.ip_stats.clear()
             self.stats_buffer.clear()
             self.selected_ips.clear()
+            self.ip_tags.clear()
+            self.histories.clear()
+            self.trend_cache.clear()
+            self.stats_index.clear()
+            self.rollups.clear()
+            self.remote_groups.clear()
+            self.expanded_groups.clear()
+            self.firing_alerts.clear()
             self.status_var.set('Cleared all IPs')
+            self._sync_watchlist()
+            self._sync_groups()
             self.update_table()
 
     def on_close(self):
-        """Stop monitoring, terminate backend, and close GUI."""
-        self.stop_monitor()
+        """Ask the backend to snapshot its state and exit, then close GUI.
+
+        Monitoring is left as it is so the next launch picks up where this one
+        stopped; the backend is terminated if it does not exit by itself.
+        """
+        if self.running and self.sock:
+            try:
+                msg = json.dumps({'cmd': 'shutdown'}) + '\n'
+                self.sock.sendall(msg.encode('utf-8'))
+                if self.backend_process:
+                    self.backend_process.wait(timeout=3)
+            except Exception as e:
+                print(f"Shutdown error: {e}")
         self.running = False
         if self.sock:
             try:
@@ -783,6 +2383,18 @@ class PingGUI:
         self.root.destroy()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Multi-IP Ping Monitor')
+    parser.add_argument('--sweep', nargs='+', metavar='TARGET',
+                        help='probe CIDR ranges / IPs once without the GUI, e.g. 10.0.0.0/16')
+    parser.add_argument('--concurrency', type=int, default=256, help='probes in flight (default 256)')
+    parser.add_argument('--timeout', type=int, default=1000, help='probe timeout in ms (default 1000)')
+    parser.add_argument('--all', action='store_true', help='also list addresses that did not answer')
+    parser.add_argument('--json', action='store_true', help='print the raw JSON events')
+    args, _unknown = parser.parse_known_args()
+    if args.sweep:
+        targets = [target for arg in args.sweep for target in arg.replace(',', ' ').split()]
+        sys.exit(headless_sweep(targets, args.concurrency, args.timeout, args.all, args.json))
+    
     root = tk.Tk()
     app = PingGUI(root)
     root.mainloop()
\ No newline at end of file
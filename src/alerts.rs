@@ -0,0 +1,555 @@
+// Threshold alerting: sliding-window rules evaluated per probe, plus the
+// dispatcher that dedupes, rate-limits and fans alerts out to sinks.
+use serde::{Deserialize, Serialize};
+use std::collections::{HashMap, HashSet, VecDeque};
+use std::io::{Read, Write};
+use std::net::{TcpStream, ToSocketAddrs};
+use std::process::{Command, Stdio};
+use std::sync::Arc;
+use tokio::sync::{broadcast, mpsc, watch};
+use tokio::time::{Duration, Instant};
+
+#[cfg(target_os = "windows")]
+use std::os::windows::process::CommandExt;
+
+pub const ALERT_CONFIG_FILE: &str = "alerts.json";
+
+#[derive(Debug, Deserialize, Serialize, Clone)]
+#[serde(default)]
+pub struct AlertConfig {
+    pub window: usize,          // probes in the sliding window
+    pub fail_rate: f64,         // %, fire when the window fail rate goes above it
+    pub down_secs: u64,         // fire when a host stays unreachable this long, 0 disables
+    pub min_repeat_secs: u64,   // per IP and rule, quiet period between two notifications
+    pub max_per_minute: u32,    // global budget for notification sinks
+    pub log_file: Option<String>,
+    pub webhook: Option<String>, // http://host:port/path, receives the alert as JSON
+    pub command: Option<String>, // run through the shell with PING_ALERT_* variables set
+    pub desktop: bool,
+}
+
+impl Default for AlertConfig {
+    fn default() -> Self {
+        AlertConfig {
+            window: 20,
+            fail_rate: 50.0,
+            down_secs: 30,
+            min_repeat_secs: 300,
+            max_per_minute: 30,
+            log_file: Some("ping_alerts.log".to_string()),
+            webhook: None,
+            command: None,
+            desktop: true,
+        }
+    }
+}
+
+impl AlertConfig {
+    pub fn load(path: &str) -> AlertConfig {
+        match std::fs::read_to_string(path) {
+            Ok(text) => serde_json::from_str(&text).unwrap_or_else(|e| {
+                eprintln!("Invalid {}: {}, using default alert rules", path, e);
+                AlertConfig::default()
+            }),
+            Err(_) => AlertConfig::default(),
+        }
+    }
+}
+
+#[derive(Debug, Serialize, Clone)]
+pub struct AlertEvent {
+    pub event: &'static str, // always "alert", tells clients this is not a PingStat
+    pub ip: String,
+    pub rule: &'static str,  // "fail_rate" or "down"
+    pub state: &'static str, // "firing" or "resolved"
+    pub message: String,
+    pub timestamp: u64,
+}
+
+impl AlertEvent {
+    fn new(ip: &str, rule: &'static str, state: &'static str, message: String, timestamp: u64) -> Self {
+        AlertEvent { event: "alert", ip: ip.to_string(), rule, state, message, timestamp }
+    }
+}
+
+/// Per-IP rule state. `record` does O(1) amortized work per probe and only
+/// returns events on state transitions, so a host that stays down alerts once.
+#[derive(Debug, Clone, Default)]
+pub struct AlertWindow {
+    results: VecDeque<bool>,
+    fails: usize,
+    down_since: Option<u64>,
+    fail_rate_firing: bool,
+    down_firing: bool,
+}
+
+impl AlertWindow {
+    /// Rebuild a window saved with `parts`, e.g. from a snapshot.
+    pub fn from_parts(results: VecDeque<bool>, down_since: Option<u64>, fail_rate_firing: bool, down_firing: bool) -> Self {
+        let fails = results.iter().filter(|ok| !**ok).count();
+        AlertWindow { results, fails, down_since, fail_rate_firing, down_firing }
+    }
+
+    /// Probe results (oldest first), down-since timestamp and the two firing flags.
+    pub fn parts(&self) -> (&VecDeque<bool>, Option<u64>, bool, bool) {
+        (&self.results, self.down_since, self.fail_rate_firing, self.down_firing)
+    }
+
+    /// Forget the down-since time and both firing flags, for when probing
+    /// stops or the window comes back from a snapshot: time without probes is
+    /// not downtime. Returns a "resolved" event for each rule that was firing;
+    /// the probe results are kept.
+    pub fn clear(&mut self, ip: &str, now: u64, reason: &str) -> Vec<AlertEvent> {
+        let mut events = Vec::new();
+        self.down_since = None;
+        if std::mem::take(&mut self.fail_rate_firing) {
+            events.push(AlertEvent::new(ip, "fail_rate", "resolved", format!(
+                "{} fail rate alert cleared, {}", ip, reason
+            ), now));
+        }
+        if std::mem::take(&mut self.down_firing) {
+            events.push(AlertEvent::new(ip, "down", "resolved", format!(
+                "{} down alert cleared, {}", ip, reason
+            ), now));
+        }
+        events
+    }
+
+    pub fn record(&mut self, ip: &str, success: bool, now: u64, cfg: &AlertConfig) -> Vec<AlertEvent> {
+        let mut events = Vec::new();
+
+        self.results.push_back(success);
+        if !success {
+            self.fails += 1;
+        }
+        // Also drains extra entries when the window was shrunk by a config change
+        while self.results.len() > cfg.window.max(1) {
+            if self.results.pop_front() == Some(false) {
+                self.fails -= 1;
+            }
+        }
+
+        let rate = self.fails as f64 * 100.0 / self.results.len() as f64;
+        let window_full = self.results.len() >= cfg.window.max(1);
+        if !self.fail_rate_firing && window_full && rate > cfg.fail_rate {
+            self.fail_rate_firing = true;
+            events.push(AlertEvent::new(ip, "fail_rate", "firing", format!(
+                "{} failed {:.0}% of the last {} probes", ip, rate, self.results.len()
+            ), now));
+        } else if self.fail_rate_firing && rate <= cfg.fail_rate {
+            self.fail_rate_firing = false;
+            events.push(AlertEvent::new(ip, "fail_rate", "resolved", format!(
+                "{} fail rate back to {:.0}% over the last {} probes", ip, rate, self.results.len()
+            ), now));
+        }
+
+        if success {
+            if let Some(since) = self.down_since.take() {
+                if self.down_firing {
+                    self.down_firing = false;
+                    events.push(AlertEvent::new(ip, "down", "resolved", format!(
+                        "{} is reachable again after {}s", ip, now.saturating_sub(since)
+                    ), now));
+                }
+            }
+        } else {
+            let since = *self.down_since.get_or_insert(now);
+            let down_for = now.saturating_sub(since);
+            if cfg.down_secs > 0 && !self.down_firing && down_for >= cfg.down_secs {
+                self.down_firing = true;
+                events.push(AlertEvent::new(ip, "down", "firing", format!(
+                    "{} has been unreachable for {}s", ip, down_for
+                ), now));
+            }
+        }
+
+        events
+    }
+}
+
+/// Somewhere alerts can be delivered. Delivery runs on the blocking pool,
+/// so implementations may do plain blocking I/O.
+pub trait AlertSink: Send + Sync {
+    fn name(&self) -> &'static str;
+    fn deliver(&self, event: &AlertEvent) -> std::io::Result<()>;
+}
+
+pub struct LogFileSink {
+    pub path: String,
+}
+
+impl AlertSink for LogFileSink {
+    fn name(&self) -> &'static str {
+        "log file"
+    }
+
+    fn deliver(&self, event: &AlertEvent) -> std::io::Result<()> {
+        let mut file = std::fs::OpenOptions::new().create(true).append(true).open(&self.path)?;
+        let time = chrono::DateTime::<chrono::Utc>::from(
+            std::time::UNIX_EPOCH + Duration::from_secs(event.timestamp)
+        ).format("%Y-%m-%d %H:%M:%S");
+        writeln!(file, "{} [{}] {} {}: {}", time, event.state, event.ip, event.rule, event.message)
+    }
+}
+
+pub struct WebhookSink {
+    pub url: String,
+}
+
+impl AlertSink for WebhookSink {
+    fn name(&self) -> &'static str {
+        "webhook"
+    }
+
+    fn deliver(&self, event: &AlertEvent) -> std::io::Result<()> {
+        use std::io::{Error, ErrorKind};
+
+        let rest = self.url.strip_prefix("http://").ok_or_else(|| {
+            Error::new(ErrorKind::InvalidInput, "only http:// webhooks are supported")
+        })?;
+        let (host, path) = match rest.find('/') {
+            Some(i) => (&rest[..i], &rest[i..]),
+            None => (rest, "/"),
+        };
+        let target = if host.contains(':') { host.to_string() } else { format!("{}:80", host) };
+        let addr = target.to_socket_addrs()?.next().ok_or_else(|| {
+            Error::new(ErrorKind::NotFound, format!("cannot resolve {}", host))
+        })?;
+
+        let body = serde_json::to_string(event)?;
+        let mut stream = TcpStream::connect_timeout(&addr, Duration::from_secs(2))?;
+        stream.set_read_timeout(Some(Duration::from_secs(5)))?;
+        stream.set_write_timeout(Some(Duration::from_secs(5)))?;
+        write!(
+            stream,
+            "POST {} HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: close\r\n\r\n{}",
+            path, host, body.len(), body
+        )?;
+
+        let mut status = [0u8; 12];
+        stream.read_exact(&mut status)?;
+        // "HTTP/1.1 2xx"
+        if status[9] != b'2' {
+            return Err(Error::new(ErrorKind::Other, format!(
+                "webhook answered {}", String::from_utf8_lossy(&status[9..])
+            )));
+        }
+        Ok(())
+    }
+}
+
+pub struct CommandSink {
+    pub command: String,
+}
+
+impl AlertSink for CommandSink {
+    fn name(&self) -> &'static str {
+        "command"
+    }
+
+    fn deliver(&self, event: &AlertEvent) -> std::io::Result<()> {
+        #[cfg(target_os = "windows")]
+        let mut cmd = hidden_command("cmd");
+        #[cfg(target_os = "windows")]
+        cmd.args(["/C", &self.command]);
+
+        #[cfg(not(target_os = "windows"))]
+        let mut cmd = hidden_command("sh");
+        #[cfg(not(target_os = "windows"))]
+        cmd.args(["-c", &self.command]);
+
+        alert_env(&mut cmd, event).status()?;
+        Ok(())
+    }
+}
+
+pub struct DesktopSink;
+
+impl AlertSink for DesktopSink {
+    fn name(&self) -> &'static str {
+        "desktop notification"
+    }
+
+    fn deliver(&self, event: &AlertEvent) -> std::io::Result<()> {
+        // The message travels in the environment, so nothing needs escaping
+        #[cfg(target_os = "windows")]
+        let mut cmd = {
+            let mut cmd = hidden_command("powershell");
+            cmd.args(["-NoProfile", "-Command",
+                "Add-Type -AssemblyName System.Windows.Forms; \
+                 $n = New-Object System.Windows.Forms.NotifyIcon; \
+                 $n.Icon = [System.Drawing.SystemIcons]::Warning; $n.Visible = $true; \
+                 $n.ShowBalloonTip(5000, 'Ping alert', $env:PING_ALERT_MESSAGE, 'Warning'); \
+                 Start-Sleep -Seconds 6; $n.Dispose()"]);
+            cmd
+        };
+
+        #[cfg(target_os = "macos")]
+        let mut cmd = {
+            let mut cmd = hidden_command("osascript");
+            cmd.args(["-e", "display notification (system attribute \"PING_ALERT_MESSAGE\") with title \"Ping alert\""]);
+            cmd
+        };
+
+        #[cfg(not(any(target_os = "windows", target_os = "macos")))]
+        let mut cmd = {
+            let mut cmd = hidden_command("notify-send");
+            cmd.args(["Ping alert", &event.message]);
+            cmd
+        };
+
+        alert_env(&mut cmd, event).status()?;
+        Ok(())
+    }
+}
+
+fn hidden_command(program: &str) -> Command {
+    let mut cmd = Command::new(program);
+    cmd.stdin(Stdio::null()).stdout(Stdio::null()).stderr(Stdio::null());
+    #[cfg(target_os = "windows")]
+    cmd.creation_flags(0x08000000); // CREATE_NO_WINDOW
+    cmd
+}
+
+fn alert_env<'a>(cmd: &'a mut Command, event: &AlertEvent) -> &'a mut Command {
+    cmd.env("PING_ALERT_IP", &event.ip)
+        .env("PING_ALERT_RULE", event.rule)
+        .env("PING_ALERT_STATE", event.state)
+        .env("PING_ALERT_MESSAGE", &event.message)
+        .env("PING_ALERT_JSON", serde_json::to_string(event).unwrap_or_default())
+}
+
+fn notification_sinks(cfg: &AlertConfig) -> Vec<Arc<dyn AlertSink>> {
+    let mut sinks: Vec<Arc<dyn AlertSink>> = Vec::new();
+    if let Some(url) = &cfg.webhook {
+        sinks.push(Arc::new(WebhookSink { url: url.clone() }));
+    }
+    if let Some(command) = &cfg.command {
+        sinks.push(Arc::new(CommandSink { command: command.clone() }));
+    }
+    if cfg.desktop {
+        sinks.push(Arc::new(DesktopSink));
+    }
+    sinks
+}
+
+async fn deliver(sink: Arc<dyn AlertSink>, event: AlertEvent) {
+    let name = sink.name();
+    match tokio::task::spawn_blocking(move || sink.deliver(&event)).await {
+        Ok(Err(e)) => eprintln!("Alert sink {} failed: {}", name, e),
+        Err(e) => eprintln!("Alert sink {} panicked: {}", name, e),
+        Ok(Ok(())) => {}
+    }
+}
+
+/// Decides which transitions reach the notification sinks: firing alerts
+/// respect the per-IP quiet period, resolves only follow a notified firing,
+/// and everything shares a token bucket refilled at `max_per_minute`.
+struct NotifyGate {
+    last_notified: HashMap<(String, &'static str), Instant>,
+    firing_notified: HashSet<(String, &'static str)>,
+    tokens: f64,
+    last_refill: Instant,
+    suppressed: u64,
+}
+
+impl NotifyGate {
+    fn new(cfg: &AlertConfig, now: Instant) -> Self {
+        NotifyGate {
+            last_notified: HashMap::new(),
+            firing_notified: HashSet::new(),
+            tokens: cfg.max_per_minute as f64,
+            last_refill: now,
+            suppressed: 0,
+        }
+    }
+
+    /// Whether to notify about `event`. An admitted event carries the count
+    /// of alerts the budget suppressed since the last one in its message.
+    fn admit(&mut self, event: &mut AlertEvent, cfg: &AlertConfig, now: Instant) -> bool {
+        let key = (event.ip.clone(), event.rule);
+        if event.state == "firing" {
+            if let Some(sent) = self.last_notified.get(&key) {
+                if now.duration_since(*sent) < Duration::from_secs(cfg.min_repeat_secs) {
+                    return false;
+                }
+            }
+        } else if !self.firing_notified.remove(&key) {
+            // Nobody was told about the firing side, so stay quiet about the resolve
+            return false;
+        }
+
+        let budget = cfg.max_per_minute as f64;
+        self.tokens = (self.tokens + now.duration_since(self.last_refill).as_secs_f64() * budget / 60.0).min(budget);
+        self.last_refill = now;
+        if self.tokens < 1.0 {
+            self.suppressed += 1;
+            return false;
+        }
+        self.tokens -= 1.0;
+
+        if self.suppressed > 0 {
+            event.message = format!("{} ({} more alerts suppressed)", event.message, self.suppressed);
+            self.suppressed = 0;
+        }
+        if event.state == "firing" {
+            self.last_notified.insert(key.clone(), now);
+            self.firing_notified.insert(key);
+        }
+        true
+    }
+}
+
+/// Receives rule transitions from the ping tasks. Every transition goes to
+/// connected clients and the log file; notification sinks only get alerts that
+/// pass the per-IP quiet period and the global per-minute budget.
+pub async fn alert_dispatcher(
+    mut events: mpsc::UnboundedReceiver<AlertEvent>,
+    config: watch::Receiver<AlertConfig>,
+    clients: broadcast::Sender<String>,
+) {
+    let mut gate = NotifyGate::new(&config.borrow(), Instant::now());
+
+    while let Some(mut event) = events.recv().await {
+        let cfg = config.borrow().clone();
+
+        if let Ok(line) = serde_json::to_string(&event) {
+            let _ = clients.send(line);
+        }
+        if let Some(path) = &cfg.log_file {
+            deliver(Arc::new(LogFileSink { path: path.clone() }), event.clone()).await;
+        }
+
+        if !gate.admit(&mut event, &cfg, Instant::now()) {
+            continue;
+        }
+        for sink in notification_sinks(&cfg) {
+            tokio::spawn(deliver(sink, event.clone()));
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn config(window: usize, fail_rate: f64, down_secs: u64) -> AlertConfig {
+        AlertConfig { window, fail_rate, down_secs, ..AlertConfig::default() }
+    }
+
+    // (rule, state) of each event, in order
+    fn kinds(events: &[AlertEvent]) -> Vec<(&'static str, &'static str)> {
+        events.iter().map(|event| (event.rule, event.state)).collect()
+    }
+
+    #[test]
+    fn fail_rate_waits_for_a_full_window_and_fires_once() {
+        let cfg = config(4, 50.0, 0);
+        let mut window = AlertWindow::default();
+        for t in 0..3 {
+            assert!(window.record("10.0.0.1", false, t, &cfg).is_empty());
+        }
+        assert_eq!(kinds(&window.record("10.0.0.1", false, 3, &cfg)), vec![("fail_rate", "firing")]);
+        assert!(window.record("10.0.0.1", false, 4, &cfg).is_empty());
+
+        // [F, F, S] then [F, S, S]: at 50% the rule no longer holds
+        assert!(window.record("10.0.0.1", true, 5, &cfg).is_empty());
+        let events = window.record("10.0.0.1", true, 6, &cfg);
+        assert_eq!(kinds(&events), vec![("fail_rate", "resolved")]);
+        assert!(events[0].message.contains("50%"));
+        assert!(window.record("10.0.0.1", true, 7, &cfg).is_empty());
+    }
+
+    #[test]
+    fn shrinking_the_window_drops_the_oldest_results() {
+        let mut window = AlertWindow::default();
+        for t in 0..10 {
+            window.record("10.0.0.1", false, t, &config(10, 50.0, 0));
+        }
+        assert!(window.parts().2);
+
+        // Down to 2 probes: [F, S] is 50%, which resolves the alert
+        let events = window.record("10.0.0.1", true, 10, &config(2, 50.0, 0));
+        assert_eq!(kinds(&events), vec![("fail_rate", "resolved")]);
+        assert_eq!(window.parts().0, &VecDeque::from([false, true]));
+        assert_eq!(kinds(&window.record("10.0.0.1", false, 11, &config(2, 40.0, 0))), vec![("fail_rate", "firing")]);
+    }
+
+    #[test]
+    fn down_fires_after_down_secs_and_resolves_with_the_duration() {
+        let cfg = config(100, 50.0, 30);
+        let mut window = AlertWindow::default();
+        for t in [100, 110, 129] {
+            assert!(window.record("10.0.0.1", false, t, &cfg).is_empty());
+        }
+        let events = window.record("10.0.0.1", false, 130, &cfg);
+        assert_eq!(kinds(&events), vec![("down", "firing")]);
+        assert!(events[0].message.contains("30s"));
+        assert!(window.record("10.0.0.1", false, 140, &cfg).is_empty());
+
+        let events = window.record("10.0.0.1", true, 150, &cfg);
+        assert_eq!(kinds(&events), vec![("down", "resolved")]);
+        assert!(events[0].message.contains("50s"));
+        assert_eq!(window.parts().1, None);
+
+        // down_secs 0 turns the rule off
+        let mut window = AlertWindow::default();
+        for t in [0, 1000] {
+            assert!(window.record("10.0.0.1", false, t, &config(100, 50.0, 0)).is_empty());
+        }
+    }
+
+    #[test]
+    fn clear_resolves_firing_rules_and_forgets_the_downtime() {
+        let cfg = config(2, 50.0, 10);
+        let mut window = AlertWindow::default();
+        window.record("10.0.0.1", false, 100, &cfg);
+        assert_eq!(kinds(&window.record("10.0.0.1", false, 115, &cfg)), vec![("fail_rate", "firing"), ("down", "firing")]);
+
+        let events = window.clear("10.0.0.1", 120, "monitoring stopped");
+        assert_eq!(kinds(&events), vec![("fail_rate", "resolved"), ("down", "resolved")]);
+        assert!(events[0].message.ends_with("monitoring stopped"));
+        assert!(window.clear("10.0.0.1", 121, "monitoring stopped").is_empty());
+        assert_eq!(window.parts(), (&VecDeque::from([false, false]), None, false, false));
+
+        // Long after the stop, one failure starts a new outage, not a 1000 s one
+        let events = window.record("10.0.0.1", false, 1120, &cfg);
+        assert_eq!(kinds(&events), vec![("fail_rate", "firing")]);
+        assert_eq!(window.parts().1, Some(1120));
+    }
+
+    #[test]
+    fn gate_holds_repeats_for_the_quiet_period() {
+        let cfg = AlertConfig { min_repeat_secs: 300, max_per_minute: 30, ..AlertConfig::default() };
+        let start = Instant::now();
+        let at = |secs| start + Duration::from_secs(secs);
+        let mut gate = NotifyGate::new(&cfg, start);
+        let event = |ip: &str, state| AlertEvent::new(ip, "down", state, String::new(), 0);
+
+        assert!(gate.admit(&mut event("10.0.0.1", "firing"), &cfg, at(0)));
+        assert!(gate.admit(&mut event("10.0.0.1", "resolved"), &cfg, at(5)));
+        // Flapping within the quiet period: neither side is notified
+        assert!(!gate.admit(&mut event("10.0.0.1", "firing"), &cfg, at(10)));
+        assert!(!gate.admit(&mut event("10.0.0.1", "resolved"), &cfg, at(20)));
+        // Other IPs have their own period
+        assert!(gate.admit(&mut event("10.0.0.2", "firing"), &cfg, at(20)));
+        assert!(gate.admit(&mut event("10.0.0.1", "firing"), &cfg, at(300)));
+    }
+
+    #[test]
+    fn gate_spends_a_per_minute_budget_and_reports_what_it_dropped() {
+        let cfg = AlertConfig { min_repeat_secs: 0, max_per_minute: 2, ..AlertConfig::default() };
+        let start = Instant::now();
+        let mut gate = NotifyGate::new(&cfg, start);
+        let mut events: Vec<AlertEvent> = (1..=4)
+            .map(|i| AlertEvent::new(&format!("10.0.0.{}", i), "down", "firing", "down".to_string(), 0))
+            .collect();
+
+        assert!(gate.admit(&mut events[0], &cfg, start));
+        assert!(gate.admit(&mut events[1], &cfg, start));
+        assert!(!gate.admit(&mut events[2], &cfg, start + Duration::from_secs(10)));
+        // 30 s refill one token at 2 per minute
+        assert!(gate.admit(&mut events[3], &cfg, start + Duration::from_secs(30)));
+        assert_eq!(events[3].message, "down (1 more alerts suppressed)");
+    }
+}
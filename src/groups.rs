@@ -0,0 +1,143 @@
+// Group rollups: aggregate health per site/subnet, adjusted member by member
+// as probes come in instead of being recomputed over all members.
+use crate::PingStat;
+use serde::Serialize;
+use std::collections::{BTreeMap, HashMap, HashSet};
+
+#[derive(Debug, Serialize, Clone, Default)]
+pub struct GroupStat {
+    pub event: &'static str, // always "group"
+    pub group: String,
+    pub members: u64,
+    pub up: u64,   // last probe answered
+    pub down: u64, // last probe failed
+    pub pass: u64,
+    pub fail: u64,
+    pub disconnected_time: u64, // ms, summed over members
+    pub worst_latency: Option<u64>, // ms
+    #[serde(skip)]
+    latencies: BTreeMap<u64, u32>, // multiset of member latencies, for the max
+}
+
+// What one member adds to its group
+#[derive(Clone, Copy, Default)]
+struct Contribution {
+    pass: u64,
+    fail: u64,
+    disconnected_time: u64,
+    up: bool,
+    down: bool,
+    latency: Option<u64>,
+}
+
+impl Contribution {
+    fn of(stat: &PingStat) -> Self {
+        Contribution {
+            pass: stat.pass,
+            fail: stat.fail,
+            disconnected_time: stat.disconnected_time,
+            up: stat.last_ping_time > 0 && stat.latency.is_some(),
+            down: stat.last_ping_time > 0 && stat.latency.is_none(),
+            latency: stat.latency,
+        }
+    }
+}
+
+impl GroupStat {
+    fn add(&mut self, c: &Contribution) {
+        self.pass += c.pass;
+        self.fail += c.fail;
+        self.disconnected_time += c.disconnected_time;
+        self.up += c.up as u64;
+        self.down += c.down as u64;
+        if let Some(ms) = c.latency {
+            *self.latencies.entry(ms).or_insert(0) += 1;
+        }
+        self.worst_latency = self.latencies.keys().next_back().copied();
+    }
+
+    fn subtract(&mut self, c: &Contribution) {
+        self.pass -= c.pass;
+        self.fail -= c.fail;
+        self.disconnected_time -= c.disconnected_time;
+        self.up -= c.up as u64;
+        self.down -= c.down as u64;
+        if let Some(ms) = c.latency {
+            if let Some(n) = self.latencies.get_mut(&ms) {
+                *n -= 1;
+                if *n == 0 {
+                    self.latencies.remove(&ms);
+                }
+            }
+        }
+        self.worst_latency = self.latencies.keys().next_back().copied();
+    }
+}
+
+/// Group membership as set by the client, plus the rollup of every group.
+/// `update` costs O(log n) per probe; `rebuild` is only for structural
+/// changes such as a new membership map, a reset or a restore.
+#[derive(Default)]
+pub struct Groups {
+    group_of: HashMap<String, String>,
+    members: HashMap<String, HashSet<String>>,
+    stats: HashMap<String, GroupStat>,
+    contributions: HashMap<String, Contribution>,
+}
+
+impl Groups {
+    pub fn set_membership(&mut self, group_of: HashMap<String, String>, stats: &HashMap<String, PingStat>) {
+        self.group_of = group_of;
+        self.members.clear();
+        for (ip, group) in &self.group_of {
+            self.members.entry(group.clone()).or_default().insert(ip.clone());
+        }
+        self.rebuild(stats);
+    }
+
+    pub fn rebuild(&mut self, stats: &HashMap<String, PingStat>) {
+        self.stats.clear();
+        self.contributions.clear();
+        for (group, members) in &self.members {
+            let mut agg = GroupStat { event: "group", group: group.clone(), ..GroupStat::default() };
+            agg.members = members.len() as u64;
+            for ip in members {
+                if let Some(stat) = stats.get(ip) {
+                    let c = Contribution::of(stat);
+                    agg.add(&c);
+                    self.contributions.insert(ip.clone(), c);
+                }
+            }
+            self.stats.insert(group.clone(), agg);
+        }
+    }
+
+    /// Swap the member's old contribution for its new one.
+    pub fn update(&mut self, stat: &PingStat) {
+        let group = match self.group_of.get(&stat.ip) {
+            Some(group) => group,
+            None => return,
+        };
+        let agg = match self.stats.get_mut(group) {
+            Some(agg) => agg,
+            None => return,
+        };
+        let c = Contribution::of(stat);
+        if let Some(old) = self.contributions.insert(stat.ip.clone(), c) {
+            agg.subtract(&old);
+        }
+        agg.add(&c);
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.group_of.is_empty()
+    }
+
+    pub fn all(&self) -> impl Iterator<Item = &GroupStat> {
+        self.stats.values()
+    }
+
+    pub fn members_of<'a>(&'a self, group: &str) -> impl Iterator<Item = &'a String> + 'a {
+        self.members.get(group).into_iter().flatten()
+    }
+}
@@ -1,12 +1,22 @@
 #![cfg_attr(target_os = "windows", windows_subsystem = "windows")]
+mod alerts;
+mod groups;
+mod snapshot;
+mod sweep;
+
+use alerts::{AlertConfig, AlertEvent, AlertWindow, ALERT_CONFIG_FILE};
+use groups::Groups;
+use snapshot::SNAPSHOT_FILE;
+use sweep::{SweepEvent, SweepRequest};
 use std::process::{Command, Stdio};
 use serde::{Deserialize, Serialize};
 use std::collections::{HashMap, HashSet};
 use std::net::{SocketAddr, IpAddr};
 use std::str::FromStr;
 use tokio::io::{AsyncBufReadExt, AsyncWriteExt, BufReader};
+use tokio::net::tcp::OwnedWriteHalf;
 use tokio::net::{TcpListener, TcpStream};
-use tokio::sync::{mpsc, oneshot, Mutex, Semaphore};
+use tokio::sync::{broadcast, mpsc, oneshot, watch, Mutex, Semaphore};
 use tokio::time::{self, Duration};
 use std::sync::Arc;
 use csv::Writer;
@@ -23,6 +33,49 @@ enum ClientCommand {
     Stop,
     #[serde(rename = "export")]
     Export,
+    #[serde(rename = "set_alerts")]
+    SetAlerts(AlertConfig),
+    #[serde(rename = "set_watchlist")]
+    SetWatchlist {
+        ips: Vec<String>,
+        #[serde(default)]
+        tags: HashMap<String, String>,
+    },
+    #[serde(rename = "set_groups")]
+    SetGroups { groups: HashMap<String, String> },
+    #[serde(rename = "set_stream")]
+    SetStream {
+        #[serde(default)]
+        groups_only: bool,
+        #[serde(default)]
+        expanded: Vec<String>,
+        #[serde(default)]
+        quiet: bool,
+    },
+    #[serde(rename = "sweep")]
+    Sweep {
+        targets: Vec<String>,
+        #[serde(default = "default_sweep_concurrency")]
+        concurrency: usize,
+        #[serde(default = "default_sweep_timeout")]
+        timeout_ms: u64,
+        #[serde(default)]
+        include_dead: bool,
+    },
+    #[serde(rename = "cancel_sweep")]
+    CancelSweep,
+    #[serde(rename = "reset")]
+    Reset,
+    #[serde(rename = "shutdown")]
+    Shutdown,
+}
+
+fn default_sweep_concurrency() -> usize {
+    sweep::DEFAULT_CONCURRENCY
+}
+
+fn default_sweep_timeout() -> u64 {
+    sweep::DEFAULT_TIMEOUT_MS
 }
 
 #[derive(Debug, Serialize, Clone)]
@@ -32,27 +85,77 @@ struct PingStat {
     fail: u64,
     disconnected_time: u64, // ms
     last_ping_time: u64, // timestamp
+    latency: Option<u64>, // ms, None when the last probe failed
+    #[serde(skip)]
+    window: AlertWindow, // recent probe results, kept here so snapshots include them
+}
+
+impl PingStat {
+    fn new(ip: &str) -> Self {
+        PingStat {
+            ip: ip.to_string(),
+            pass: 0,
+            fail: 0,
+            disconnected_time: 0,
+            last_ping_time: 0,
+            latency: None,
+            window: AlertWindow::default(),
+        }
+    }
 }
 
 type SharedStats = Arc<Mutex<HashMap<String, PingStat>>>;
+// Locked after SharedStats whenever both are needed
+type SharedGroups = Arc<Mutex<Groups>>;
 
 enum PingControl {
     Start(Vec<String>, u64),
     SetInterval(u64),
     Stop,
     Export(oneshot::Sender<Vec<PingStat>>),
+    SetAlerts(AlertConfig),
+    SetWatchlist(Vec<String>, HashMap<String, String>),
+    SetGroups(HashMap<String, String>),
+    Reset,
+    Shutdown,
 }
 
 struct PingManager {
     tasks: HashMap<String, mpsc::Sender<PingTaskControl>>,
     interval: u64,
+    watchlist: Vec<String>, // every IP the client knows, monitored or not
+    tags: HashMap<String, String>, // site tags imported with the IP list
 }
 
+// Per-client stream settings: with groups_only, only group rollups and the
+// members of expanded groups are sent; quiet sends no periodic updates
+#[derive(Clone, Default)]
+struct StreamMode {
+    groups_only: bool,
+    expanded: HashSet<String>,
+    quiet: bool,
+}
+
+// Snapshot requests; Some(ack) is answered once the file is on disk
+type SnapshotRequest = Option<oneshot::Sender<()>>;
+
+// How often the monitoring state is written to disk
+const SNAPSHOT_PERIOD: Duration = Duration::from_secs(10);
+// Targets encoded per stats lock acquisition
+const SNAPSHOT_CHUNK: usize = 1024;
+
 enum PingTaskControl {
     UpdateInterval(u64),
     Stop,
 }
 
+// What a ping task needs to evaluate alert rules after each probe
+#[derive(Clone)]
+struct AlertHandle {
+    config: watch::Receiver<AlertConfig>,
+    events: mpsc::UnboundedSender<AlertEvent>,
+}
+
 // Semaphore to limit concurrent pings
 static PING_SEMAPHORE: tokio::sync::OnceCell<Arc<Semaphore>> = tokio::sync::OnceCell::const_new();
 
@@ -68,12 +171,62 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
     let manager = Arc::new(Mutex::new(PingManager {
         tasks: HashMap::new(),
         interval: 1000,
+        watchlist: Vec::new(),
+        tags: HashMap::new(),
     }));
+    let groups: SharedGroups = Arc::new(Mutex::new(Groups::default()));
     let (ctrl_tx, mut ctrl_rx) = mpsc::unbounded_channel();
 
+    // --no-state: neither restore nor save ping_state.bin, for throwaway
+    // backends such as the one a headless sweep starts
+    let keep_state = !std::env::args().any(|arg| arg == "--no-state");
+
+    // Restore the previous run before anyone connects
+    let restored = std::time::Instant::now();
+    let previous = if keep_state { snapshot::load(SNAPSHOT_FILE) } else { Ok(None) };
+    match previous {
+        Ok(Some(snap)) => {
+            let count = snap.targets.len();
+            let targets: Vec<String> = snap.targets.iter().map(|stat| stat.ip.clone()).collect();
+            let now = unix_now();
+            stats.lock().await.extend(snap.targets.into_iter().map(|mut stat| {
+                // The gap since the last run was not probed; alert rules start over
+                // (the previous run's notifications are not carried across)
+                stat.window.clear(&stat.ip, now, "backend restarted");
+                (stat.ip.clone(), stat)
+            }));
+            {
+                let mut m = manager.lock().await;
+                m.interval = snap.interval;
+                m.watchlist = snap.watchlist;
+                m.tags = snap.tags;
+            }
+            if snap.monitoring {
+                ctrl_tx.send(PingControl::Start(targets, snap.interval))?;
+            }
+            println!("Restored {} targets from {} in {:?}", count, SNAPSHOT_FILE, restored.elapsed());
+        }
+        Ok(None) => {}
+        Err(e) => eprintln!("Cannot restore {}: {}", SNAPSHOT_FILE, e),
+    }
+
+    // Task: write snapshots periodically and on request, off the probing path
+    let (snapshot_tx, snapshot_rx) = mpsc::unbounded_channel::<SnapshotRequest>();
+    let snapshot_path = if keep_state { Some(SNAPSHOT_FILE) } else { None };
+    tokio::spawn(snapshot_task(stats.clone(), manager.clone(), snapshot_rx, snapshot_path));
+
+    // Alerts: rules are evaluated in the ping tasks, delivered by the dispatcher,
+    // and every transition is also pushed to connected clients
+    let (alert_config_tx, alert_config_rx) = watch::channel(AlertConfig::load(ALERT_CONFIG_FILE));
+    let (alert_tx, alert_rx) = mpsc::unbounded_channel();
+    let (client_events_tx, _) = broadcast::channel::<String>(1024);
+    tokio::spawn(alerts::alert_dispatcher(alert_rx, alert_config_rx.clone(), client_events_tx.clone()));
+    let alert_handle = AlertHandle { config: alert_config_rx, events: alert_tx };
+
     // Task: manage control commands
     let stats_ctrl = stats.clone();
     let manager_ctrl = manager.clone();
+    let groups_ctrl = groups.clone();
     tokio::spawn(async move {
         while let Some(cmd) = ctrl_rx.recv().await {
             match cmd {
@@ -89,7 +242,14 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
                         if let Some(tx) = m.tasks.remove(ip) {
                             let _ = tx.send(PingTaskControl::Stop).await;
                         }
-                        stats_ctrl.lock().await.remove(ip);
+                    }
+                    // Counters of IPs that stay in the list carry on from where they were
+                    {
+                        let mut stats_guard = stats_ctrl.lock().await;
+                        stats_guard.retain(|ip, _| new_ips.contains(ip));
+                        groups_ctrl.lock().await.rebuild(&stats_guard);
+                        // Also catches a probe that finished after the last stop
+                        clear_alerts(&mut stats_guard, new_ips.difference(&old_ips), "monitoring restarted", &alert_handle);
                     }
                     
                     // Start new tasks with staggered start
@@ -98,13 +258,15 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
                         let (tx, rx) = mpsc::channel(1);
                         m.tasks.insert(ip.clone(), tx);
                         let stats = stats_ctrl.clone();
+                        let groups = groups_ctrl.clone();
                         let ip_clone = ip.clone();
+                        let alerts = alert_handle.clone();
                         
                         tokio::spawn(async move {
                             if start_delay > 0 {
                                 tokio::time::sleep(Duration::from_millis(start_delay)).await;
                             }
-                            ping_task(ip_clone, interval, stats, rx).await;
+                            ping_task(ip_clone, interval, stats, groups, rx, alerts).await;
                         });
                         
                         start_delay += 10;
@@ -125,17 +287,50 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
                     }
                 }
                 PingControl::Stop => {
+                    // Counters are kept so they can be exported, snapshotted and resumed
                     let mut m = manager_ctrl.lock().await;
+                    let stopped: Vec<String> = m.tasks.keys().cloned().collect();
                     for (_ip, tx) in m.tasks.drain() {
                         let _ = tx.send(PingTaskControl::Stop).await;
                     }
-                    stats_ctrl.lock().await.clear();
+                    // Alerts do not outlive the probing that raised them
+                    clear_alerts(&mut *stats_ctrl.lock().await, stopped.iter(), "monitoring stopped", &alert_handle);
+                    let _ = snapshot_tx.send(None);
                 }
                 PingControl::Export(resp_tx) => {
                     let stats = stats_ctrl.lock().await;
                     let data: Vec<PingStat> = stats.values().cloned().collect();
                     let _ = resp_tx.send(data);
                 }
+                PingControl::SetAlerts(config) => {
+                    let _ = alert_config_tx.send(config);
+                }
+                PingControl::SetWatchlist(ips, tags) => {
+                    let mut m = manager_ctrl.lock().await;
+                    m.watchlist = ips;
+                    m.tags = tags;
+                    let _ = snapshot_tx.send(None);
+                }
+                PingControl::SetGroups(group_of) => {
+                    let stats_guard = stats_ctrl.lock().await;
+                    groups_ctrl.lock().await.set_membership(group_of, &stats_guard);
+                }
+                PingControl::Reset => {
+                    let mut stats_guard = stats_ctrl.lock().await;
+                    let ips: Vec<String> = stats_guard.keys().cloned().collect();
+                    clear_alerts(&mut stats_guard, ips.iter(), "counters reset", &alert_handle);
+                    for stat in stats_guard.values_mut() {
+                        *stat = PingStat::new(&stat.ip);
+                    }
+                    groups_ctrl.lock().await.rebuild(&stats_guard);
+                }
+                PingControl::Shutdown => {
+                    let (ack_tx, ack_rx) = oneshot::channel();
+                    let _ = snapshot_tx.send(Some(ack_tx));
+                    let _ = ack_rx.await;
+                    println!("Snapshot written, shutting down");
+                    std::process::exit(0);
+                }
             }
         }
     });
@@ -145,8 +340,10 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
         let stats = stats.clone();
         let ctrl_tx = ctrl_tx.clone();
         let manager = manager.clone();
+        let groups = groups.clone();
+        let client_events = client_events_tx.subscribe();
         tokio::spawn(async move {
-            if let Err(e) = handle_client(socket, addr, stats, ctrl_tx, manager).await {
+            if let Err(e) = handle_client(socket, addr, stats, groups, ctrl_tx, manager, client_events).await {
                 eprintln!("Client error: {}", e);
             }
         });
@@ -155,40 +352,127 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
 
 }
 
+struct AbortOnDrop(Vec<tokio::task::JoinHandle<()>>);
+
+impl Drop for AbortOnDrop {
+    fn drop(&mut self) {
+        for task in &self.0 {
+            task.abort();
+        }
+    }
+}
+
 async fn handle_client(
     socket: TcpStream,
     _addr: SocketAddr,
     stats: SharedStats,
+    groups: SharedGroups,
     ctrl_tx: mpsc::UnboundedSender<PingControl>,
-    _manager: Arc<Mutex<PingManager>>,
+    manager: Arc<Mutex<PingManager>>,
+    mut client_events: broadcast::Receiver<String>,
 ) -> Result<(), Box<dyn std::error::Error>> {
     let (reader, mut writer) = socket.into_split();
     let mut reader = BufReader::new(reader).lines();
 
+    // Tell the client what is being monitored, so it can rebuild its list after a restart
+    {
+        let m = manager.lock().await;
+        let targets: Vec<String> = stats.lock().await.keys().cloned().collect();
+        let state = serde_json::json!({
+            "event": "state",
+            "watchlist": m.watchlist,
+            "tags": m.tags,
+            "targets": targets,
+            "interval": m.interval,
+            "monitoring": !m.tasks.is_empty(),
+        });
+        writer.write_all(state.to_string().as_bytes()).await?;
+        writer.write_all(b"\n").await?;
+    }
+
     // Task to send stats to client every 500ms
     let stats_send = stats.clone();
+    let groups_send = groups.clone();
+    let stream_mode = Arc::new(Mutex::new(StreamMode::default()));
+    let stream_mode_send = stream_mode.clone();
     let writer = Arc::new(Mutex::new(writer));
     let writer_send = writer.clone();
-    tokio::spawn(async move {
+    let sender = tokio::spawn(async move {
         let mut send_interval = time::interval(Duration::from_millis(500));
         loop {
             send_interval.tick().await;
-            let stats_guard = stats_send.lock().await;
-            let mut writer_guard = writer_send.lock().await;
-            for stat in stats_guard.values() {
-                if let Ok(msg) = serde_json::to_string(stat) {
-                    let _ = writer_guard.write_all(msg.as_bytes()).await;
-                    let _ = writer_guard.write_all(b"\n").await;
+            let mode = stream_mode_send.lock().await.clone();
+            if mode.quiet {
+                continue;
+            }
+            // Serialize under the locks, write after releasing them
+            let mut batch = Vec::new();
+            {
+                let stats_guard = stats_send.lock().await;
+                let groups_guard = groups_send.lock().await;
+                let mut push = |msg: serde_json::Result<String>| {
+                    if let Ok(msg) = msg {
+                        batch.extend_from_slice(msg.as_bytes());
+                        batch.push(b'\n');
+                    }
+                };
+                if mode.groups_only && !groups_guard.is_empty() {
+                    for group in groups_guard.all() {
+                        push(serde_json::to_string(group));
+                    }
+                    for group in &mode.expanded {
+                        for ip in groups_guard.members_of(group) {
+                            if let Some(stat) = stats_guard.get(ip) {
+                                push(serde_json::to_string(stat));
+                            }
+                        }
+                    }
+                } else {
+                    for stat in stats_guard.values() {
+                        push(serde_json::to_string(stat));
+                    }
                 }
             }
+            if writer_send.lock().await.write_all(&batch).await.is_err() {
+                break; // client gone
+            }
         }
     });
 
+    // Task to forward alert events as they happen
+    let writer_events = writer.clone();
+    let forwarder = tokio::spawn(async move {
+        loop {
+            match client_events.recv().await {
+                Ok(line) => {
+                    let mut writer_guard = writer_events.lock().await;
+                    if writer_guard.write_all(line.as_bytes()).await.is_err()
+                        || writer_guard.write_all(b"\n").await.is_err()
+                    {
+                        break; // client gone
+                    }
+                }
+                Err(broadcast::error::RecvError::Lagged(_)) => continue,
+                Err(broadcast::error::RecvError::Closed) => break,
+            }
+        }
+    });
+    // Both tasks go away with the connection, however handle_client returns
+    let _tasks = AbortOnDrop(vec![sender, forwarder]);
+
+    // One sweep at a time per client; dropping the sender cancels it
+    let mut sweep_cancel: Option<oneshot::Sender<()>> = None;
+    let mut sweep_id = 0;
+    // Only a client that started monitoring stops it when it goes away, so
+    // a headless sweep client can come and go next to the GUI
+    let mut started_monitoring = false;
+
     while let Some(line) = reader.next_line().await? {
         if let Ok(cmd) = serde_json::from_str::<ClientCommand>(&line) {
             match cmd {
                 ClientCommand::Start { ips, interval } => {
                     println!("Starting ping for {} IPs with interval {}ms", ips.len(), interval);
+                    started_monitoring = true;
                     ctrl_tx.send(PingControl::Start(ips, interval))?;
                 }
                 ClientCommand::SetInterval { interval } => {
@@ -197,6 +481,64 @@ async fn handle_client(
                 ClientCommand::Stop => {
                     ctrl_tx.send(PingControl::Stop)?;
                 }
+                ClientCommand::SetAlerts(config) => {
+                    println!("Updating alert rules: {:?}", config);
+                    ctrl_tx.send(PingControl::SetAlerts(config))?;
+                }
+                ClientCommand::SetWatchlist { ips, tags } => {
+                    ctrl_tx.send(PingControl::SetWatchlist(ips, tags))?;
+                }
+                ClientCommand::SetGroups { groups } => {
+                    println!("Grouping {} IPs", groups.len());
+                    ctrl_tx.send(PingControl::SetGroups(groups))?;
+                }
+                ClientCommand::SetStream { groups_only, expanded, quiet } => {
+                    *stream_mode.lock().await = StreamMode {
+                        groups_only,
+                        expanded: expanded.into_iter().collect(),
+                        quiet,
+                    };
+                }
+                ClientCommand::Sweep { targets, concurrency, timeout_ms, include_dead } => {
+                    sweep_id += 1;
+                    if let Some(previous) = sweep_cancel.take() {
+                        let _ = previous.send(());
+                    }
+                    match sweep::expand(&targets) {
+                        Ok(targets) => {
+                            println!("Sweeping {} addresses, {} in flight, {}ms timeout", targets.len(), concurrency, timeout_ms);
+                            let (cancel_tx, cancel_rx) = oneshot::channel();
+                            sweep_cancel = Some(cancel_tx);
+                            let request = SweepRequest {
+                                id: sweep_id,
+                                targets,
+                                concurrency,
+                                timeout: Duration::from_millis(timeout_ms),
+                                include_dead,
+                            };
+                            tokio::spawn(sweep_to_client(request, writer.clone(), cancel_rx));
+                        }
+                        Err(message) => {
+                            let event = SweepEvent::Error { id: sweep_id, message };
+                            if let Ok(line) = serde_json::to_string(&event) {
+                                let mut writer_guard = writer.lock().await;
+                                let _ = writer_guard.write_all(line.as_bytes()).await;
+                                let _ = writer_guard.write_all(b"\n").await;
+                            }
+                        }
+                    }
+                }
+                ClientCommand::CancelSweep => {
+                    if let Some(cancel) = sweep_cancel.take() {
+                        let _ = cancel.send(());
+                    }
+                }
+                ClientCommand::Reset => {
+                    ctrl_tx.send(PingControl::Reset)?;
+                }
+                ClientCommand::Shutdown => {
+                    ctrl_tx.send(PingControl::Shutdown)?;
+                }
                 ClientCommand::Export => {
                     let (resp_tx, resp_rx) = oneshot::channel();
                     ctrl_tx.send(PingControl::Export(resp_tx))?;
@@ -209,10 +551,100 @@ async fn handle_client(
             }
         }
     }
-    ctrl_tx.send(PingControl::Stop)?;
+    if started_monitoring {
+        ctrl_tx.send(PingControl::Stop)?;
+    }
     Ok(())
 }
 
+// Run a sweep and stream its events to the client that asked for it. Events
+// that pile up while a write is in progress go out together in the next one.
+async fn sweep_to_client(
+    request: SweepRequest,
+    writer: Arc<Mutex<OwnedWriteHalf>>,
+    cancel: oneshot::Receiver<()>,
+) {
+    let (events_tx, mut events_rx) = mpsc::unbounded_channel();
+    let sweep = tokio::spawn(sweep::run(request, sweep::ping, events_tx, cancel));
+    while let Some(event) = events_rx.recv().await {
+        let mut batch = Vec::new();
+        let mut push = |event: SweepEvent| {
+            if let Ok(line) = serde_json::to_string(&event) {
+                batch.extend_from_slice(line.as_bytes());
+                batch.push(b'\n');
+            }
+        };
+        push(event);
+        while let Ok(event) = events_rx.try_recv() {
+            push(event);
+        }
+        if writer.lock().await.write_all(&batch).await.is_err() {
+            break;
+        }
+    }
+    if let Ok(summary) = sweep.await {
+        println!(
+            "Sweep {} finished: {}/{} alive in {}ms{}",
+            summary.id, summary.alive, summary.total, summary.elapsed_ms,
+            if summary.cancelled { " (cancelled)" } else { "" }
+        );
+    }
+}
+
+// Without a path nothing is saved and requests are only acknowledged
+async fn snapshot_task(
+    stats: SharedStats,
+    manager: Arc<Mutex<PingManager>>,
+    mut requests: mpsc::UnboundedReceiver<SnapshotRequest>,
+    path: Option<&'static str>,
+) {
+    let mut ticker = time::interval(SNAPSHOT_PERIOD);
+    ticker.tick().await; // the first tick fires immediately, nothing to save yet
+    loop {
+        let ack = tokio::select! {
+            _ = ticker.tick() => None,
+            request = requests.recv() => match request {
+                Some(ack) => ack,
+                None => break,
+            },
+        };
+        let path = match path {
+            Some(path) => path,
+            None => {
+                if let Some(ack) = ack {
+                    let _ = ack.send(());
+                }
+                continue;
+            }
+        };
+
+        // The stats lock is only held to copy the keys, then per chunk of
+        // targets, so probes and client updates interleave with encoding.
+        // Targets added meanwhile wait for the next snapshot, removed ones are
+        // skipped. Disk I/O happens on the blocking pool
+        let mut encoder = {
+            let m = manager.lock().await;
+            snapshot::Encoder::new(m.interval, !m.tasks.is_empty(), &m.watchlist, &m.tags)
+        };
+        let ips: Vec<String> = stats.lock().await.keys().cloned().collect();
+        for chunk in ips.chunks(SNAPSHOT_CHUNK) {
+            let stats_guard = stats.lock().await;
+            for stat in chunk.iter().filter_map(|ip| stats_guard.get(ip)) {
+                encoder.push(stat);
+            }
+        }
+        let data = encoder.finish();
+        match tokio::task::spawn_blocking(move || snapshot::write_atomic(path, &data)).await {
+            Ok(Err(e)) => eprintln!("Snapshot write failed: {}", e),
+            Err(e) => eprintln!("Snapshot task panicked: {}", e),
+            Ok(Ok(())) => {}
+        }
+        if let Some(ack) = ack {
+            let _ = ack.send(());
+        }
+    }
+}
+
 async fn export_csv(stats: &[PingStat]) -> Result<(), Box<dyn std::error::Error>> {
     let mut wtr = Writer::from_path("ping_stats_export.csv")?;
     wtr.write_record(&["IP", "Pass", "Fail", "Disconnected Time (ms)", "Last Ping Time"])?;
@@ -238,15 +670,38 @@ async fn export_csv(stats: &[PingStat]) -> Result<(), Box<dyn std::error::Error>
     Ok(())
 }
 
+fn unix_now() -> u64 {
+    std::time::SystemTime::now()
+        .duration_since(std::time::UNIX_EPOCH)
+        .unwrap()
+        .as_secs()
+}
+
+// Clear the alert state of the given IPs, sending "resolved" for what was firing
+fn clear_alerts<'a>(
+    stats: &mut HashMap<String, PingStat>,
+    ips: impl Iterator<Item = &'a String>,
+    reason: &str,
+    alerts: &AlertHandle,
+) {
+    let now = unix_now();
+    for ip in ips {
+        if let Some(stat) = stats.get_mut(ip) {
+            for event in stat.window.clear(ip, now, reason) {
+                let _ = alerts.events.send(event);
+            }
+        }
+    }
+}
+
 async fn ping_task(
     ip: String,
     mut interval: u64,
     stats: SharedStats,
+    groups: SharedGroups,
     mut ctrl_rx: mpsc::Receiver<PingTaskControl>,
+    alerts: AlertHandle,
 ) {
-    let mut pass = 0u64;
-    let mut fail = 0u64;
-    let disconnected_time = 0u64; // Set to 0 as per requirement
     let mut ticker = time::interval(Duration::from_millis(interval));
     
     let ip_addr = match IpAddr::from_str(&ip) {
@@ -259,83 +714,102 @@ async fn ping_task(
 
     println!("Started ping task for {}", ip);
     
-    // Initialize stats immediately
-    {
-        let mut stats_guard = stats.lock().await;
-        stats_guard.insert(
-            ip.clone(),
-            PingStat {
-                ip: ip.clone(),
-                pass: 0,
-                fail: 0,
-                disconnected_time: 0,
-                last_ping_time: 0,
-            },
-        );
-    }
+    // Initialize stats immediately, or resume restored/stopped counters
+    stats.lock().await.entry(ip.clone()).or_insert_with(|| PingStat::new(&ip));
+    let mut last_probe: Option<std::time::Instant> = None;
 
     loop {
         tokio::select! {
             _ = ticker.tick() => {
-                let timestamp = std::time::SystemTime::now()
-                    .duration_since(std::time::UNIX_EPOCH)
-                    .unwrap()
-                    .as_secs();
+                let timestamp = unix_now();
+                // A failed probe counts the time since the previous one as
+                // downtime, the interval for the first probe of this task
+                let probe_started = std::time::Instant::now();
+                let since_last = last_probe
+                    .map_or(interval, |last| probe_started.duration_since(last).as_millis() as u64);
+                last_probe = Some(probe_started);
                 
-                let success = timeout_ping(&ip_addr).await;
+                let latency = timeout_ping(&ip_addr).await;
                 
-                if success {
-                    pass += 1;
-                } else {
-                    fail += 1;
+                let events = {
+                    let mut stats_guard = stats.lock().await;
+                    // A stop sent while the probe ran wins over its result. Checked
+                    // under the lock the stop handler clears alert state with
+                    if let Ok(ctrl) = ctrl_rx.try_recv() {
+                        if !apply_control(ctrl, &ip, &mut interval, &mut ticker) {
+                            break;
+                        }
+                    }
+                    let stat = stats_guard.entry(ip.clone()).or_insert_with(|| PingStat::new(&ip));
+                    if latency.is_some() {
+                        stat.pass += 1;
+                    } else {
+                        stat.fail += 1;
+                        stat.disconnected_time += since_last;
+                    }
+                    stat.last_ping_time = timestamp;
+                    stat.latency = latency;
+                    groups.lock().await.update(stat);
+
+                    let config = alerts.config.borrow();
+                    stat.window.record(&ip, latency.is_some(), timestamp, &config)
+                };
+                for event in events {
+                    let _ = alerts.events.send(event);
                 }
-
-                let mut stats_guard = stats.lock().await;
-                stats_guard.insert(
-                    ip.clone(),
-                    PingStat {
-                        ip: ip.clone(),
-                        pass,
-                        fail,
-                        disconnected_time,
-                        last_ping_time: timestamp,
-                    },
-                );
             }
             Some(ctrl) = ctrl_rx.recv() => {
-                match ctrl {
-                    PingTaskControl::UpdateInterval(new_interval) => {
-                        interval = new_interval;
-                        ticker = time::interval(Duration::from_millis(interval));
-                        println!("Updated interval for {} to {}ms", ip, interval);
-                    }
-                    PingTaskControl::Stop => {
-                        println!("Stopped ping task for {}", ip);
-                        break;
-                    }
+                if !apply_control(ctrl, &ip, &mut interval, &mut ticker) {
+                    break;
                 }
             }
         }
     }
 }
 
-async fn timeout_ping(ip: &IpAddr) -> bool {
+// Returns false when the task has to stop
+fn apply_control(ctrl: PingTaskControl, ip: &str, interval: &mut u64, ticker: &mut time::Interval) -> bool {
+    match ctrl {
+        PingTaskControl::UpdateInterval(new_interval) => {
+            *interval = new_interval;
+            *ticker = time::interval(Duration::from_millis(new_interval));
+            println!("Updated interval for {} to {}ms", ip, new_interval);
+            true
+        }
+        PingTaskControl::Stop => {
+            println!("Stopped ping task for {}", ip);
+            false
+        }
+    }
+}
+
+// Returns the round-trip time in ms, or None if the host did not answer
+async fn timeout_ping(ip: &IpAddr) -> Option<u64> {
     let semaphore = PING_SEMAPHORE.get().unwrap();
     let _permit = semaphore.acquire().await.unwrap();
     
     let timeout_duration = Duration::from_secs(2);
     
     match tokio::time::timeout(timeout_duration, async_ping(ip)).await {
-        Ok(result) => result,
-        Err(_) => false,
+        Ok(latency) => latency,
+        Err(_) => None,
     }
 }
 
-async fn async_ping(ip: &IpAddr) -> bool {
+async fn async_ping(ip: &IpAddr) -> Option<u64> {
     let ip_str = ip.to_string();
     tokio::task::spawn_blocking(move || {
         system_ping(&ip_str)
-    }).await.unwrap_or(false)
+    }).await.unwrap_or(None)
+}
+
+// The reply's own "time=" when ping printed one, else the process time
+fn reply_latency(output: std::process::Output, started: std::time::Instant) -> Option<u64> {
+    if !output.status.success() {
+        return None;
+    }
+    sweep::parse_rtt(&String::from_utf8_lossy(&output.stdout))
+        .or_else(|| Some(started.elapsed().as_millis() as u64))
 }
 
 // fn system_ping(ip: &str) -> bool {
@@ -361,26 +835,28 @@ async fn async_ping(ip: &IpAddr) -> bool {
 use std::os::windows::process::CommandExt; // Để dùng .creation_flags()
 
 #[cfg(target_os = "windows")]
-pub fn system_ping(ip: &str) -> bool {
+pub fn system_ping(ip: &str) -> Option<u64> {
     const CREATE_NO_WINDOW: u32 = 0x08000000;
 
+    let started = std::time::Instant::now();
     let output = Command::new("ping")
         .args(["-n", "1", "-w", "1000", ip])
         .creation_flags(CREATE_NO_WINDOW)  // Ngăn mở cửa sổ CMD
-        .stdout(Stdio::null())             // Không in ra stdout
+        .stdout(Stdio::piped())            // Đọc "time=" từ stdout
         .stderr(Stdio::null())             // Không in lỗi ra stderr
         .output();
 
-    output.map(|o| o.status.success()).unwrap_or(false)
+    output.ok().and_then(|o| reply_latency(o, started))
 }
 
 #[cfg(not(target_os = "windows"))]
-pub fn system_ping(ip: &str) -> bool {
+pub fn system_ping(ip: &str) -> Option<u64> {
+    let started = std::time::Instant::now();
     let output = Command::new("ping")
         .args(["-c", "1", "-W", "1", ip])
-        .stdout(Stdio::null())
+        .stdout(Stdio::piped())
         .stderr(Stdio::null())
         .output();
 
-    output.map(|o| o.status.success()).unwrap_or(false)
+    output.ok().and_then(|o| reply_latency(o, started))
 }
@@ -0,0 +1,332 @@
+// Compact binary snapshot of the monitoring state: interval, tagged watchlist
+// and the counters plus alert window of every target. All integers are little
+// endian.
+//
+//   b"PCSNAP" version:u8 flags:u8 interval:u64
+//   watchlist: count:u32 { ip:str tag:str (empty = none, version 2+) }
+//   targets:   count:u32 { ip:str pass:u64 fail:u64 disconnected_time:u64
+//                          last_ping_time:u64 latency:u32 (u32::MAX = none)
+//                          down_since:u64 (0 = none) window_flags:u8
+//                          window_len:u16 window_bits:[u8; ceil(len / 8)] }
+//   str = len:u16 utf-8 bytes
+use crate::alerts::AlertWindow;
+use crate::PingStat;
+use std::collections::{HashMap, VecDeque};
+use std::io::{Error, ErrorKind, Result, Write};
+
+pub const SNAPSHOT_FILE: &str = "ping_state.bin";
+
+const MAGIC: &[u8; 6] = b"PCSNAP";
+const VERSION: u8 = 2;
+const FLAG_MONITORING: u8 = 1;
+const WINDOW_FAIL_RATE_FIRING: u8 = 1;
+const WINDOW_DOWN_FIRING: u8 = 2;
+const NO_LATENCY: u32 = u32::MAX;
+
+pub struct Snapshot {
+    pub interval: u64,
+    pub monitoring: bool,
+    pub watchlist: Vec<String>,
+    pub tags: HashMap<String, String>,
+    pub targets: Vec<PingStat>,
+}
+
+/// Builds a snapshot one target at a time, so the caller can take the stats
+/// lock for a chunk of targets at a time instead of for the whole map.
+pub struct Encoder {
+    out: Vec<u8>,
+    count_at: usize,
+    count: u32,
+}
+
+impl Encoder {
+    /// Header and watchlist; targets follow with `push`.
+    pub fn new(interval: u64, monitoring: bool, watchlist: &[String], tags: &HashMap<String, String>) -> Self {
+        let mut out = Vec::with_capacity(32 + watchlist.len() * (18 + 64));
+        out.extend_from_slice(MAGIC);
+        out.push(VERSION);
+        out.push(if monitoring { FLAG_MONITORING } else { 0 });
+        out.extend_from_slice(&interval.to_le_bytes());
+
+        out.extend_from_slice(&(watchlist.len() as u32).to_le_bytes());
+        for ip in watchlist {
+            put_str(&mut out, ip);
+            put_str(&mut out, tags.get(ip).map_or("", |tag| tag.as_str()));
+        }
+
+        // Target count, filled in by `finish`
+        let count_at = out.len();
+        out.extend_from_slice(&0u32.to_le_bytes());
+        Encoder { out, count_at, count: 0 }
+    }
+
+    pub fn push(&mut self, stat: &PingStat) {
+        let out = &mut self.out;
+        self.count += 1;
+        put_str(out, &stat.ip);
+        out.extend_from_slice(&stat.pass.to_le_bytes());
+        out.extend_from_slice(&stat.fail.to_le_bytes());
+        out.extend_from_slice(&stat.disconnected_time.to_le_bytes());
+        out.extend_from_slice(&stat.last_ping_time.to_le_bytes());
+        let latency = stat.latency.map_or(NO_LATENCY, |ms| ms.min(NO_LATENCY as u64 - 1) as u32);
+        out.extend_from_slice(&latency.to_le_bytes());
+
+        let (results, down_since, fail_rate_firing, down_firing) = stat.window.parts();
+        out.extend_from_slice(&down_since.unwrap_or(0).to_le_bytes());
+        let mut flags = 0;
+        if fail_rate_firing {
+            flags |= WINDOW_FAIL_RATE_FIRING;
+        }
+        if down_firing {
+            flags |= WINDOW_DOWN_FIRING;
+        }
+        out.push(flags);
+
+        let skip = results.len().saturating_sub(u16::MAX as usize);
+        let len = results.len() - skip;
+        out.extend_from_slice(&(len as u16).to_le_bytes());
+        let mut byte = 0u8;
+        for (i, ok) in results.iter().skip(skip).enumerate() {
+            if *ok {
+                byte |= 1 << (i % 8);
+            }
+            if i % 8 == 7 {
+                out.push(byte);
+                byte = 0;
+            }
+        }
+        if len % 8 != 0 {
+            out.push(byte);
+        }
+    }
+
+    pub fn finish(mut self) -> Vec<u8> {
+        self.out[self.count_at..self.count_at + 4].copy_from_slice(&self.count.to_le_bytes());
+        self.out
+    }
+}
+
+pub fn decode(data: &[u8]) -> Result<Snapshot> {
+    let mut r = Reader { data };
+    if r.take(MAGIC.len())? != MAGIC {
+        return Err(Error::new(ErrorKind::InvalidData, "not a ping_check snapshot"));
+    }
+    let version = r.u8()?;
+    if version == 0 || version > VERSION {
+        return Err(Error::new(ErrorKind::InvalidData, format!("unsupported snapshot version {}", version)));
+    }
+    let flags = r.u8()?;
+    let interval = r.u64()?;
+
+    let count = r.u32()? as usize;
+    let mut watchlist = Vec::with_capacity(count.min(data.len()));
+    let mut tags = HashMap::new();
+    for _ in 0..count {
+        let ip = r.string()?;
+        if version >= 2 {
+            let tag = r.string()?;
+            if !tag.is_empty() {
+                tags.insert(ip.clone(), tag);
+            }
+        }
+        watchlist.push(ip);
+    }
+
+    let count = r.u32()? as usize;
+    let mut targets = Vec::with_capacity(count.min(data.len()));
+    for _ in 0..count {
+        let ip = r.string()?;
+        let pass = r.u64()?;
+        let fail = r.u64()?;
+        let disconnected_time = r.u64()?;
+        let last_ping_time = r.u64()?;
+        let latency = match r.u32()? {
+            NO_LATENCY => None,
+            ms => Some(ms as u64),
+        };
+        let down_since = match r.u64()? {
+            0 => None,
+            ts => Some(ts),
+        };
+        let window_flags = r.u8()?;
+        let len = r.u16()? as usize;
+        let bits = r.take((len + 7) / 8)?;
+        let results: VecDeque<bool> = (0..len).map(|i| bits[i / 8] & (1 << (i % 8)) != 0).collect();
+
+        targets.push(PingStat {
+            ip,
+            pass,
+            fail,
+            disconnected_time,
+            last_ping_time,
+            latency,
+            window: AlertWindow::from_parts(
+                results,
+                down_since,
+                window_flags & WINDOW_FAIL_RATE_FIRING != 0,
+                window_flags & WINDOW_DOWN_FIRING != 0,
+            ),
+        });
+    }
+
+    Ok(Snapshot { interval, monitoring: flags & FLAG_MONITORING != 0, watchlist, tags, targets })
+}
+
+/// Write to a temporary file next to `path` and rename it into place, so a
+/// crash mid-write never leaves a truncated snapshot behind.
+pub fn write_atomic(path: &str, data: &[u8]) -> Result<()> {
+    let tmp = format!("{}.tmp", path);
+    {
+        let mut file = std::fs::File::create(&tmp)?;
+        file.write_all(data)?;
+        file.sync_all()?;
+    }
+    std::fs::rename(&tmp, path)
+}
+
+/// Ok(None) when there is no snapshot yet.
+pub fn load(path: &str) -> Result<Option<Snapshot>> {
+    match std::fs::read(path) {
+        Ok(data) => decode(&data).map(Some),
+        Err(e) if e.kind() == ErrorKind::NotFound => Ok(None),
+        Err(e) => Err(e),
+    }
+}
+
+fn put_str(out: &mut Vec<u8>, s: &str) {
+    let bytes = &s.as_bytes()[..s.len().min(u16::MAX as usize)];
+    out.extend_from_slice(&(bytes.len() as u16).to_le_bytes());
+    out.extend_from_slice(bytes);
+}
+
+struct Reader<'a> {
+    data: &'a [u8],
+}
+
+impl<'a> Reader<'a> {
+    fn take(&mut self, n: usize) -> Result<&'a [u8]> {
+        if self.data.len() < n {
+            return Err(Error::new(ErrorKind::UnexpectedEof, "snapshot is truncated"));
+        }
+        let (head, rest) = self.data.split_at(n);
+        self.data = rest;
+        Ok(head)
+    }
+
+    fn u8(&mut self) -> Result<u8> {
+        Ok(self.take(1)?[0])
+    }
+
+    fn u16(&mut self) -> Result<u16> {
+        Ok(u16::from_le_bytes(self.take(2)?.try_into().unwrap()))
+    }
+
+    fn u32(&mut self) -> Result<u32> {
+        Ok(u32::from_le_bytes(self.take(4)?.try_into().unwrap()))
+    }
+
+    fn u64(&mut self) -> Result<u64> {
+        Ok(u64::from_le_bytes(self.take(8)?.try_into().unwrap()))
+    }
+
+    fn string(&mut self) -> Result<String> {
+        let len = self.u16()? as usize;
+        String::from_utf8(self.take(len)?.to_vec())
+            .map_err(|e| Error::new(ErrorKind::InvalidData, e))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn stat(ip: &str, pass: u64, latency: Option<u64>, window: AlertWindow) -> PingStat {
+        PingStat { pass, fail: 3, disconnected_time: 1500, last_ping_time: 1_700_000_000, latency, window, ..PingStat::new(ip) }
+    }
+
+    fn encode(interval: u64, monitoring: bool, watchlist: &[String], tags: &HashMap<String, String>, stats: &[PingStat]) -> Vec<u8> {
+        let mut encoder = Encoder::new(interval, monitoring, watchlist, tags);
+        for stat in stats {
+            encoder.push(stat);
+        }
+        encoder.finish()
+    }
+
+    // A version 1 file: untagged watchlist, one target
+    fn v1_file() -> Vec<u8> {
+        let mut out = MAGIC.to_vec();
+        out.push(1);
+        out.push(FLAG_MONITORING);
+        out.extend_from_slice(&500u64.to_le_bytes());
+        out.extend_from_slice(&1u32.to_le_bytes());
+        put_str(&mut out, "10.0.0.1");
+        out.extend_from_slice(&1u32.to_le_bytes());
+        put_str(&mut out, "10.0.0.1");
+        for value in [7u64, 3, 1500, 1_700_000_000] {
+            out.extend_from_slice(&value.to_le_bytes());
+        }
+        out.extend_from_slice(&NO_LATENCY.to_le_bytes());
+        out.extend_from_slice(&0u64.to_le_bytes());
+        out.push(0);
+        out.extend_from_slice(&3u16.to_le_bytes());
+        out.push(0b101);
+        out
+    }
+
+    #[test]
+    fn round_trip() {
+        // 21 results: a partial last byte
+        let results: VecDeque<bool> = (0..21).map(|i| i % 3 != 0).collect();
+        let stats = vec![
+            stat("10.0.0.1", 7, None, AlertWindow::from_parts(results.clone(), Some(1_699_999_990), true, false)),
+            stat("fd00::2", 9, Some(12), AlertWindow::from_parts((0..16).map(|_| true).collect(), None, false, true)),
+            stat("10.0.0.3", 0, Some(u32::MAX as u64 + 5), AlertWindow::default()),
+        ];
+        let watchlist = vec!["10.0.0.1".to_string(), "10.0.0.9".to_string()];
+        let tags = HashMap::from([("10.0.0.9".to_string(), "core".to_string())]);
+
+        let snap = decode(&encode(250, true, &watchlist, &tags, &stats)).unwrap();
+        assert_eq!((snap.interval, snap.monitoring), (250, true));
+        assert_eq!(snap.watchlist, watchlist);
+        assert_eq!(snap.tags, tags);
+        assert_eq!(snap.targets.len(), stats.len());
+        for (a, b) in stats.iter().zip(&snap.targets) {
+            assert_eq!(a.ip, b.ip);
+            assert_eq!((a.pass, a.fail, a.disconnected_time, a.last_ping_time), (b.pass, b.fail, b.disconnected_time, b.last_ping_time));
+            assert_eq!(a.window.parts(), b.window.parts());
+        }
+        assert_eq!(snap.targets[1].latency, Some(12));
+        assert_eq!(snap.targets[2].latency, Some(NO_LATENCY as u64 - 1));
+
+        let snap = decode(&encode(1000, false, &[], &HashMap::new(), &[])).unwrap();
+        assert!(!snap.monitoring && snap.watchlist.is_empty() && snap.targets.is_empty());
+    }
+
+    #[test]
+    fn loads_version_1() {
+        let snap = decode(&v1_file()).unwrap();
+        assert_eq!((snap.interval, snap.monitoring), (500, true));
+        assert_eq!(snap.watchlist, vec!["10.0.0.1".to_string()]);
+        assert!(snap.tags.is_empty());
+        let target = &snap.targets[0];
+        assert_eq!((target.pass, target.fail, target.latency), (7, 3, None));
+        assert_eq!(target.window.parts(), (&VecDeque::from([true, false, true]), None, false, false));
+    }
+
+    #[test]
+    fn rejects_truncated_and_foreign_input() {
+        let stats = vec![stat("10.0.0.1", 7, Some(3), AlertWindow::from_parts((0..9).map(|i| i % 2 == 0).collect(), None, false, false))];
+        let tags = HashMap::from([("10.0.0.1".to_string(), "edge".to_string())]);
+        for data in [encode(1000, true, &["10.0.0.1".to_string()], &tags, &stats), v1_file()] {
+            for len in 0..data.len() {
+                assert!(decode(&data[..len]).is_err(), "{} of {} bytes decoded", len, data.len());
+            }
+        }
+
+        let mut data = v1_file();
+        data[MAGIC.len()] = VERSION + 1;
+        assert!(decode(&data).is_err());
+        data[0] = b'X';
+        assert!(decode(&data).is_err());
+    }
+}
@@ -0,0 +1,340 @@
+// One-shot reachability sweep: probe every address of a range or list once,
+// with a bounded number of probes in flight, and report each result as it
+// completes. Independent of the monitoring tasks and their semaphore.
+use serde::Serialize;
+use std::collections::HashSet;
+use std::future::Future;
+use std::net::IpAddr;
+use std::process::Stdio;
+use std::str::FromStr;
+use std::time::Instant;
+use tokio::process::Command;
+use tokio::sync::{mpsc, oneshot};
+use tokio::task::JoinSet;
+use tokio::time::Duration;
+
+pub const DEFAULT_CONCURRENCY: usize = 256;
+pub const MAX_CONCURRENCY: usize = 1024;
+pub const DEFAULT_TIMEOUT_MS: u64 = 1000;
+pub const MAX_TARGETS: usize = 1 << 20;
+
+// Progress events are rate limited, results are not
+const PROGRESS_PERIOD: Duration = Duration::from_millis(250);
+
+pub struct SweepRequest {
+    pub id: u64,
+    pub targets: Vec<IpAddr>,
+    pub concurrency: usize,
+    pub timeout: Duration,
+    pub include_dead: bool, // also report addresses that did not answer
+}
+
+#[derive(Debug, Serialize, Clone, Default)]
+pub struct SweepSummary {
+    pub id: u64,
+    pub total: usize,
+    pub done: usize,
+    pub alive: usize,
+    pub dead: usize,
+    pub cancelled: bool,
+    pub elapsed_ms: u64,
+    pub min_latency: Option<u64>, // ms, over the addresses that answered
+    pub avg_latency: Option<u64>,
+    pub max_latency: Option<u64>,
+    #[serde(skip)]
+    latency_sum: u64,
+}
+
+impl SweepSummary {
+    fn record(&mut self, latency: Option<u64>) {
+        self.done += 1;
+        match latency {
+            Some(ms) => {
+                self.alive += 1;
+                self.latency_sum += ms;
+                self.min_latency = Some(self.min_latency.map_or(ms, |min| min.min(ms)));
+                self.max_latency = Some(self.max_latency.map_or(ms, |max| max.max(ms)));
+                self.avg_latency = Some(self.latency_sum / self.alive as u64);
+            }
+            None => self.dead += 1,
+        }
+    }
+}
+
+#[derive(Debug, Serialize)]
+#[serde(tag = "event")]
+pub enum SweepEvent {
+    #[serde(rename = "sweep_started")]
+    Started { id: u64, total: usize, concurrency: usize, timeout_ms: u64 },
+    #[serde(rename = "sweep_result")]
+    Result { id: u64, ip: String, alive: bool, latency: Option<u64>, done: usize, total: usize },
+    #[serde(rename = "sweep_progress")]
+    Progress { id: u64, done: usize, total: usize, alive: usize },
+    #[serde(rename = "sweep_done")]
+    Done(SweepSummary),
+    #[serde(rename = "sweep_error")]
+    Error { id: u64, message: String },
+}
+
+/// Expand "10.0.0.0/16", "192.168.1.7" or "fd00::/120" entries into a
+/// de-duplicated address list, in order. IPv4 ranges up to /30 leave out
+/// their network and broadcast addresses.
+pub fn expand(specs: &[String]) -> Result<Vec<IpAddr>, String> {
+    let mut seen = HashSet::new();
+    let mut out = Vec::new();
+    for spec in specs {
+        let spec = spec.trim();
+        if spec.is_empty() {
+            continue;
+        }
+        let (addr, prefix) = match spec.split_once('/') {
+            Some((addr, prefix)) => {
+                let prefix = u32::from_str(prefix).map_err(|_| format!("invalid prefix in {}", spec))?;
+                (addr, Some(prefix))
+            }
+            None => (spec, None),
+        };
+        let addr = IpAddr::from_str(addr).map_err(|_| format!("invalid address {}", spec))?;
+        let (bits, base) = match addr {
+            IpAddr::V4(v4) => (32, u32::from(v4) as u128),
+            IpAddr::V6(v6) => (128, u128::from(v6)),
+        };
+        let prefix = prefix.unwrap_or(bits);
+        if prefix > bits {
+            return Err(format!("invalid prefix in {}", spec));
+        }
+        let host_bits = bits - prefix;
+        if host_bits > 0 && (host_bits >= 64 || (1u64 << host_bits) as usize > MAX_TARGETS - out.len()) {
+            return Err(format!("{} is too large, a sweep covers at most {} addresses", spec, MAX_TARGETS));
+        }
+        let count = 1u128 << host_bits;
+        let first = base & !(count - 1);
+        let (skip_first, skip_last) = if bits == 32 && host_bits >= 2 { (1, 1) } else { (0, 0) };
+        for offset in skip_first..count - skip_last {
+            let value = first + offset;
+            let ip = if bits == 32 {
+                IpAddr::from((value as u32).to_be_bytes())
+            } else {
+                IpAddr::from(value.to_be_bytes())
+            };
+            if seen.insert(ip) {
+                out.push(ip);
+            }
+        }
+        if out.len() > MAX_TARGETS {
+            return Err(format!("a sweep covers at most {} addresses", MAX_TARGETS));
+        }
+    }
+    Ok(out)
+}
+
+/// Probe every target once with at most `concurrency` probes in flight.
+/// A probe still running after `timeout` counts as dead and is dropped.
+/// Resolving or dropping `cancel` stops the sweep; the summary then has
+/// `cancelled` set and covers what finished so far.
+pub async fn run<P, F>(
+    request: SweepRequest,
+    probe: P,
+    events: mpsc::UnboundedSender<SweepEvent>,
+    mut cancel: oneshot::Receiver<()>,
+) -> SweepSummary
+where
+    P: Fn(IpAddr, Duration) -> F,
+    F: Future<Output = Option<u64>> + Send + 'static,
+{
+    let started = Instant::now();
+    let SweepRequest { id, targets, concurrency, timeout, include_dead } = request;
+    let total = targets.len();
+    let concurrency = concurrency.clamp(1, MAX_CONCURRENCY);
+    let mut summary = SweepSummary { id, total, ..SweepSummary::default() };
+    let _ = events.send(SweepEvent::Started { id, total, concurrency, timeout_ms: timeout.as_millis() as u64 });
+
+    let mut pending = targets.into_iter();
+    let mut in_flight = JoinSet::new();
+    let spawn = |in_flight: &mut JoinSet<(IpAddr, Option<u64>)>, ip: IpAddr| {
+        let probe = tokio::time::timeout(timeout, probe(ip, timeout));
+        in_flight.spawn(async move { (ip, probe.await.ok().flatten()) });
+    };
+    for ip in pending.by_ref().take(concurrency) {
+        spawn(&mut in_flight, ip);
+    }
+
+    let mut last_progress = Instant::now();
+    loop {
+        let joined = tokio::select! {
+            biased;
+            _ = &mut cancel => {
+                in_flight.abort_all();
+                summary.cancelled = true;
+                break;
+            }
+            joined = in_flight.join_next() => joined,
+        };
+        let joined = match joined {
+            Some(joined) => joined,
+            None => break,
+        };
+        if let Some(next) = pending.next() {
+            spawn(&mut in_flight, next);
+        }
+        let (ip, latency) = match joined {
+            Ok(result) => result,
+            Err(_) => continue, // a probe panicked; it is neither alive nor dead
+        };
+
+        summary.record(latency);
+        if latency.is_some() || include_dead {
+            let _ = events.send(SweepEvent::Result {
+                id,
+                ip: ip.to_string(),
+                alive: latency.is_some(),
+                latency,
+                done: summary.done,
+                total,
+            });
+        }
+        if last_progress.elapsed() >= PROGRESS_PERIOD {
+            last_progress = Instant::now();
+            let _ = events.send(SweepEvent::Progress { id, done: summary.done, total, alive: summary.alive });
+        }
+    }
+
+    summary.elapsed_ms = started.elapsed().as_millis() as u64;
+    let _ = events.send(SweepEvent::Done(summary.clone()));
+    summary
+}
+
+/// Round-trip time in ms from `ping` output, read from the reply line's
+/// "time=12.3 ms" or "time<1ms" (sub-millisecond times count as 0).
+/// Shared with the monitoring probe.
+pub fn parse_rtt(output: &str) -> Option<u64> {
+    let at = output.find("time=").or_else(|| output.find("time<"))?;
+    let rest = &output[at + 5..];
+    let end = rest.find(|c: char| !(c.is_ascii_digit() || c == '.')).unwrap_or(rest.len());
+    let ms = f64::from_str(&rest[..end]).ok()?;
+    Some(if output.as_bytes()[at + 4] == b'<' { 0 } else { ms.round() as u64 })
+}
+
+/// One ICMP echo through the system `ping`, as the monitoring tasks do, but
+/// as an async child process that is killed when the caller gives up on it,
+/// so short sweep timeouts do not pile up blocking threads.
+pub async fn ping(ip: IpAddr, timeout: Duration) -> Option<u64> {
+    let mut command = Command::new("ping");
+    #[cfg(target_os = "windows")]
+    {
+        const CREATE_NO_WINDOW: u32 = 0x08000000;
+        command
+            .args(["-n", "1", "-w", &timeout.as_millis().max(1).to_string()])
+            .creation_flags(CREATE_NO_WINDOW);
+    }
+    #[cfg(not(target_os = "windows"))]
+    {
+        // -W takes whole seconds; the caller's timeout cuts it shorter
+        let wait = ((timeout.as_millis() + 999) / 1000).max(1);
+        command.args(["-n", "-c", "1", "-W", &wait.to_string()]);
+    }
+    command
+        .arg(ip.to_string())
+        .stdin(Stdio::null())
+        .stdout(Stdio::piped())
+        .stderr(Stdio::null())
+        .kill_on_drop(true);
+
+    let started = Instant::now();
+    match command.output().await {
+        // Process time stands in only when the output has no "time=" (localized ping)
+        Ok(output) if output.status.success() => Some(
+            parse_rtt(&String::from_utf8_lossy(&output.stdout))
+                .unwrap_or_else(|| started.elapsed().as_millis() as u64),
+        ),
+        _ => None,
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn expand_strs(specs: &[&str]) -> Result<Vec<String>, String> {
+        let specs: Vec<String> = specs.iter().map(|spec| spec.to_string()).collect();
+        expand(&specs).map(|ips| ips.iter().map(|ip| ip.to_string()).collect())
+    }
+
+    #[test]
+    fn expand_skips_network_and_broadcast_from_slash_30() {
+        assert_eq!(expand_strs(&["10.0.0.7/30"]).unwrap(), ["10.0.0.5", "10.0.0.6"]);
+        assert_eq!(expand_strs(&["10.0.0.7/31"]).unwrap(), ["10.0.0.6", "10.0.0.7"]);
+        assert_eq!(expand_strs(&["10.0.0.7/32"]).unwrap(), ["10.0.0.7"]);
+        assert_eq!(expand_strs(&["10.0.0.7"]).unwrap(), ["10.0.0.7"]);
+        assert_eq!(expand_strs(&["10.0.0.0/24"]).unwrap().len(), 254);
+        // IPv6 has no broadcast address to leave out
+        assert_eq!(expand_strs(&["fd00::5/126"]).unwrap(), ["fd00::4", "fd00::5", "fd00::6", "fd00::7"]);
+    }
+
+    #[test]
+    fn expand_keeps_the_first_occurrence_of_each_address() {
+        assert_eq!(
+            expand_strs(&["10.0.0.0/30", " 10.0.0.2 ", "", "10.0.0.0/31"]).unwrap(),
+            ["10.0.0.1", "10.0.0.2", "10.0.0.0"]
+        );
+    }
+
+    #[test]
+    fn expand_rejects_oversized_and_malformed_ranges() {
+        assert!(expand_strs(&["10.0.0.0/11"]).is_err());
+        assert!(expand_strs(&["0.0.0.0/0"]).is_err());
+        // Each range fits, together they do not
+        assert!(expand_strs(&["10.0.0.0/13", "10.8.0.0/13", "10.16.0.0/28"]).is_err());
+        assert!(expand_strs(&["fd00::/64"]).is_err());
+        assert!(expand_strs(&["fd00::/63"]).is_err());
+        assert!(expand_strs(&["::/0"]).is_err());
+        for spec in ["10.0.0.0/33", "fd00::/129", "10.0.0.0/x", "10.0.0", "host.example"] {
+            assert!(expand_strs(&[spec]).is_err(), "{} was accepted", spec);
+        }
+    }
+
+    #[test]
+    fn parse_rtt_reads_the_reply_time() {
+        assert_eq!(parse_rtt("64 bytes from 1.1.1.1: icmp_seq=1 ttl=57 time=12.6 ms"), Some(13));
+        assert_eq!(parse_rtt("64 bytes from 127.0.0.1: icmp_seq=1 ttl=64 time=0.045 ms"), Some(0));
+        assert_eq!(parse_rtt("Reply from 8.8.8.8: bytes=32 time=23ms TTL=117"), Some(23));
+        assert_eq!(parse_rtt("Reply from 192.168.1.1: bytes=32 time<1ms TTL=64"), Some(0));
+        // The summary line's "time 0ms" is not a reply time
+        assert_eq!(parse_rtt("1 packets transmitted, 1 received, 0% packet loss, time 0ms"), None);
+        assert_eq!(parse_rtt("Antwort von 8.8.8.8: Bytes=32 Zeit=23ms TTL=117"), None);
+        assert_eq!(parse_rtt("Request timed out."), None);
+        assert_eq!(parse_rtt("time="), None);
+    }
+
+    #[tokio::test]
+    async fn run_reports_responders_and_stops_on_cancel() {
+        let targets = expand(&["10.0.0.0/29".to_string()]).unwrap();
+        let request = SweepRequest { id: 7, targets, concurrency: 2, timeout: Duration::from_secs(5), include_dead: false };
+        // .1 and .2 answer, the rest never do
+        let probe = |ip: IpAddr, _timeout| async move {
+            if ip.to_string().ends_with(".1") || ip.to_string().ends_with(".2") {
+                Some(4)
+            } else {
+                tokio::time::sleep(Duration::from_secs(60)).await;
+                None
+            }
+        };
+        let (events_tx, mut events_rx) = mpsc::unbounded_channel();
+        let (cancel_tx, cancel_rx) = oneshot::channel();
+        let sweep = tokio::spawn(run(request, probe, events_tx, cancel_rx));
+        tokio::time::sleep(Duration::from_millis(50)).await;
+        let _ = cancel_tx.send(());
+        let summary = tokio::time::timeout(Duration::from_secs(1), sweep).await.unwrap().unwrap();
+
+        assert!(summary.cancelled);
+        assert_eq!((summary.total, summary.done, summary.alive), (6, 2, 2));
+        assert_eq!(summary.avg_latency, Some(4));
+        let mut results = Vec::new();
+        while let Ok(event) = events_rx.try_recv() {
+            if let SweepEvent::Result { ip, alive, .. } = event {
+                results.push((ip, alive));
+            }
+        }
+        assert_eq!(results, [("10.0.0.1".to_string(), true), ("10.0.0.2".to_string(), true)]);
+    }
+}